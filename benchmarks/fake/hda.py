@@ -0,0 +1,133 @@
+"""
+Load an OVFX Rop HDA into the fake hou module.
+
+Reads the sections of the .hda file (Houdini INDX container) and builds
+the node type parameters from its DialogScript.
+"""
+import os
+import re
+import shlex
+import struct
+
+import hou
+
+
+def read_index(data, offset=0):
+    """Return the {name: bytes} sections of an INDX container found at offset"""
+    if data[offset:offset + 4] != b'INDX':
+        raise ValueError('Not an INDX container')
+    count = struct.unpack('>I', data[offset + 12:offset + 16])[0]
+    position = offset + 16
+    entries = []
+    for i in range(count):
+        length = struct.unpack('>I', data[position:position + 4])[0]
+        name = data[position + 4:position + 4 + length].decode()
+        position += 4 + length
+        entry_offset, size, mtime = struct.unpack('>III', data[position:position + 12])
+        position += 12
+        entries.append((name, entry_offset, size))
+    return dict((name, data[position + o:position + o + s]) for name, o, s in entries)
+
+
+def read_definitions(path):
+    """Return {node_type_name: {section_name: text}} for all definitions of an HDA file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    result = {}
+    for name, section in read_index(data).items():
+        if section[:4] == b'INDX':
+            result[name] = dict((k, v.decode('utf-8', 'replace')) for k, v in read_index(section).items() if not k.endswith('.gz'))
+    return result
+
+
+_TEMPLATES = {
+    'string': hou.StringParmTemplate,
+    'file': hou.StringParmTemplate,
+    'geometry': hou.StringParmTemplate,
+    'float': hou.FloatParmTemplate,
+    'integer': hou.IntParmTemplate,
+    'toggle': hou.ToggleParmTemplate,
+    'ordinal': hou.MenuParmTemplate,
+    'button': hou.ButtonParmTemplate,
+}
+
+
+def _blocks(text):
+    """Yield the text of every parm { } block of a DialogScript"""
+    for match in re.finditer(r'\bparm\s*\{', text):
+        depth = 0
+        for i in range(match.end() - 1, len(text)):
+            if text[i] == '{':
+                depth += 1
+            elif text[i] == '}':
+                depth -= 1
+                if not depth:
+                    yield text[match.end():i]
+                    break
+
+
+def _field(block, name):
+    match = re.search(r'^\s*{}\s+(.*)$'.format(name), block, re.M)
+    return match.group(1).strip() if match else None
+
+
+def parm_template_group(dialog_script):
+    """Build a hou.ParmTemplateGroup from the parm blocks of a DialogScript. Folders are flattened."""
+    templates = []
+    for block in _blocks(dialog_script):
+        name = shlex.split(_field(block, 'name'))[0]
+        label = shlex.split(_field(block, 'label') or '""' )
+        label = label[0] if label else ''
+        kind = _field(block, 'type')
+        size = int(_field(block, 'size') or 1)
+        values, expressions, languages = [], [], []
+        default = re.search(r'default\s*\{(.*)\}', block)
+        for token in re.finditer(r'\[\s*"((?:[^"\\]|\\.)*)"\s+(python|hscript-expr)\s*\]|"((?:[^"\\]|\\.)*)"', default.group(1) if default else ''):
+            if token.group(1) is not None:
+                values.append('' if kind in ('string', 'file', 'geometry') else 0)
+                expressions.append(token.group(1).replace('\\"', '"'))
+                languages.append(hou.scriptLanguage.Python if token.group(2) == 'python' else hou.scriptLanguage.Hscript)
+            else:
+                values.append(token.group(3))
+                expressions.append('')
+                languages.append(hou.scriptLanguage.Hscript)
+        menu_items = ()
+        menu = re.search(r'menu\s*\{([^}]*)\}', block)
+        if menu and '[' not in menu.group(1):
+            menu_items = tuple(shlex.split(menu.group(1))[0::2])
+        callback = re.search(r'parmtag\s*\{\s*"script_callback"\s+"((?:[^"\\]|\\.)*)"\s*\}', block)
+        callback = callback.group(1).replace('\\"', '"') if callback else None
+        template_class = _TEMPLATES.get(kind, hou.StringParmTemplate)
+        if template_class is hou.MenuParmTemplate:
+            template = hou.MenuParmTemplate(name, label, menu_items, script_callback=callback)
+            if values and values[0] in menu_items:
+                values = [menu_items.index(values[0])]
+        elif template_class is hou.ButtonParmTemplate:
+            template = hou.ButtonParmTemplate(name, label, script_callback=callback)
+        else:
+            template = template_class(name, label, num_components=size, script_callback=callback)
+        if values and template_class is not hou.ButtonParmTemplate:
+            if template.dataType() != hou.parmData.String:
+                for i, v in enumerate(values):
+                    if isinstance(v, str):
+                        try:
+                            values[i] = float(v) if v not in ('', 'off', 'on') else float(v == 'on')
+                        except ValueError: # a plain hscript expression like $FF
+                            values[i], expressions[i] = 0, v
+                if template.dataType() == hou.parmData.Int:
+                    values = [int(v) for v in values]
+            template.setDefaultValue(tuple(values))
+            template.setDefaultExpression(tuple(expressions))
+            template.setDefaultExpressionLanguage(tuple(languages))
+        templates.append(template)
+    return hou.ParmTemplateGroup(templates)
+
+
+def install(path):
+    """Register every definition of the HDA file as a fake hou.NodeType and return them"""
+    result = []
+    for name, sections in read_definitions(path).items():
+        category, type_name = name.split('/', 1)
+        group = parm_template_group(sections['DialogScript'])
+        result.append(hou.NodeType(category, type_name, group, sections.get('PythonModule')))
+    return result
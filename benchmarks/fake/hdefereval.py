@@ -0,0 +1,16 @@
+"""Stand-in for the Houdini hdefereval module: the deferred calls are queued until run_queue() is called"""
+queue = []
+
+
+def executeDeferred(func, *args):
+    queue.append((func, args))
+
+
+def run_queue():
+    """Run the deferred calls like the Houdini main thread would, return how many were run"""
+    count = 0
+    while queue:
+        func, args = queue.pop(0)
+        func(*args)
+        count += 1
+    return count
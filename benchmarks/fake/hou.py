@@ -0,0 +1,772 @@
+"""
+In-memory stand-in for the parts of the hou module used by roputil and the
+OVFX Rop HDAs.
+
+This is only meant to run the benchmarks on a plain Python interpreter. It
+implements nodes, parms, parm template groups, user data, HDA modules and a
+tiny hscript expression evaluator, nothing more.
+"""
+import copy
+import os
+import re
+import types
+
+
+class exprLanguage(object):
+    Python = 'Python'
+    Hscript = 'Hscript'
+
+
+class scriptLanguage(object):
+    Python = 'Python'
+    Hscript = 'Hscript'
+
+
+class parmData(object):
+    Int = 'Int'
+    Float = 'Float'
+    String = 'String'
+
+
+class severityType(object):
+    Message = 'Message'
+    ImportantMessage = 'ImportantMessage'
+    Warning = 'Warning'
+    Error = 'Error'
+
+
+class ropRenderEventType(object):
+    PreRender = 'PreRender'
+    PreFrame = 'PreFrame'
+    PostFrame = 'PostFrame'
+    PostWrite = 'PostWrite'
+    PostRender = 'PostRender'
+
+
+class Error(Exception):
+
+    def instanceMessage(self):
+        return str(self)
+
+
+class OperationFailed(Error):
+    pass
+
+
+# Counters read by the benchmarks
+stats = {'setParmTemplateGroup': 0, 'parm_set': 0, 'parm_eval': 0}
+
+_globals = {'FSTART': 1001.0, 'FEND': 1100.0, 'F': 1001.0, 'FF': 1001.0}
+_pwd = []
+_session_ids = {}
+_next_session_id = [0]
+
+
+# ---------------------------------------------------------------- Templates
+
+class ParmTemplate(object):
+
+    _data_type = parmData.String
+    _kind = 'string'
+
+    def __init__(self, name, label, num_components=1, default_value=(), default_expression=(),
+                 default_expression_language=(), script_callback=None, script_callback_language=None,
+                 tags=None, menu_items=(), menu_labels=(), join_with_next=False, is_label_hidden=False):
+        self._name = name
+        self._label = label
+        self._num_components = num_components
+        self._default_value = tuple(default_value) or tuple(self._zero() for i in range(num_components))
+        self._default_expression = tuple(default_expression) or tuple('' for i in range(num_components))
+        self._default_expression_language = tuple(default_expression_language) or tuple(scriptLanguage.Hscript for i in range(num_components))
+        self._script_callback = script_callback
+        self._script_callback_language = script_callback_language
+        self._tags = dict(tags or {})
+        self._menu_items = tuple(menu_items)
+        self._menu_labels = tuple(menu_labels)
+        self._join_with_next = join_with_next
+        self._is_label_hidden = is_label_hidden
+
+    def _zero(self):
+        return '' if self._data_type == parmData.String else 0
+
+    def name(self):
+        return self._name
+
+    def label(self):
+        return self._label
+
+    def numComponents(self):
+        return self._num_components
+
+    def dataType(self):
+        return self._data_type
+
+    def tags(self):
+        return dict(self._tags)
+
+    def setTags(self, tags):
+        self._tags = dict(tags)
+
+    def joinsWithNext(self):
+        return self._join_with_next
+
+    def setJoinWithNext(self, on):
+        self._join_with_next = on
+
+    def hideLabel(self, on):
+        self._is_label_hidden = on
+
+    def defaultValue(self):
+        return self._default_value
+
+    def setDefaultValue(self, value):
+        if not isinstance(value, (tuple, list)):
+            value = (value,)
+        self._default_value = tuple(value)
+
+    def defaultExpression(self):
+        return self._default_expression
+
+    def setDefaultExpression(self, value):
+        self._default_expression = tuple(value)
+
+    def defaultExpressionLanguage(self):
+        return self._default_expression_language
+
+    def setDefaultExpressionLanguage(self, value):
+        self._default_expression_language = tuple(value)
+
+    def menuItems(self):
+        return self._menu_items
+
+    def scriptCallback(self):
+        return self._script_callback
+
+    def parm_names(self):
+        if self._num_components == 1:
+            return [self._name]
+        return ['{}{}'.format(self._name, i + 1) for i in range(self._num_components)]
+
+    def _dialog(self):
+        return '{} {} {}'.format(self._kind, self._name, repr(sorted(self.__dict__.items())))
+
+
+class StringParmTemplate(ParmTemplate):
+    _data_type = parmData.String
+    _kind = 'string'
+
+
+class IntParmTemplate(ParmTemplate):
+    _data_type = parmData.Int
+    _kind = 'integer'
+
+
+class FloatParmTemplate(ParmTemplate):
+    _data_type = parmData.Float
+    _kind = 'float'
+
+
+class ToggleParmTemplate(ParmTemplate):
+    _data_type = parmData.Int
+    _kind = 'toggle'
+
+
+class MenuParmTemplate(ParmTemplate):
+    _data_type = parmData.Int
+    _kind = 'ordinal'
+
+    def __init__(self, name, label, menu_items, menu_labels=(), default_value=0, script_callback=None,
+                 script_callback_language=None, tags=None, **kwargs):
+        ParmTemplate.__init__(self, name, label, default_value=(default_value,), script_callback=script_callback,
+                              script_callback_language=script_callback_language, tags=tags,
+                              menu_items=menu_items, menu_labels=menu_labels, **kwargs)
+
+
+class ButtonParmTemplate(ParmTemplate):
+    _data_type = parmData.Int
+    _kind = 'button'
+
+    def __init__(self, name, label, script_callback=None, script_callback_language=None, tags=None, **kwargs):
+        ParmTemplate.__init__(self, name, label, script_callback=script_callback,
+                              script_callback_language=script_callback_language, tags=tags, **kwargs)
+
+
+class ParmTemplateGroup(object):
+
+    def __init__(self, parm_templates=()):
+        self._entries = [copy.deepcopy(t) for t in parm_templates]
+
+    def _index(self, name):
+        if isinstance(name, ParmTemplate):
+            name = name.name()
+        for i, t in enumerate(self._entries):
+            if t.name() == name:
+                return i
+        raise OperationFailed('Parm template not found: {}'.format(name))
+
+    def find(self, name):
+        for t in self._entries:
+            if t.name() == name:
+                return copy.deepcopy(t)
+        return None
+
+    def entries(self):
+        return tuple(copy.deepcopy(t) for t in self._entries)
+
+    def parmTemplates(self):
+        return self.entries()
+
+    def append(self, parm_template):
+        self._entries.append(copy.deepcopy(parm_template))
+
+    def remove(self, name):
+        del self._entries[self._index(name)]
+
+    def replace(self, name, parm_template):
+        self._entries[self._index(name)] = copy.deepcopy(parm_template)
+
+    def insertBefore(self, name, parm_template):
+        self._entries.insert(self._index(name), copy.deepcopy(parm_template))
+
+    def insertAfter(self, name, parm_template):
+        self._entries.insert(self._index(name) + 1, copy.deepcopy(parm_template))
+
+    def asDialogScript(self, *args, **kwargs):
+        return '\n'.join(t._dialog() for t in self._entries)
+
+
+# ---------------------------------------------------------------- Expressions
+
+_CH_RE = re.compile(r'\b(chs|ch)\(\s*"([^"]+)"\s*\)')
+_VAR_RE = re.compile(r'\$\{?([A-Za-z_][A-Za-z0-9_]*)\}?')
+
+
+def _variable(name):
+    if name in _globals:
+        return _globals[name]
+    return os.environ.get(name, '')
+
+
+def _hscript(expr, node):
+    """Evaluate the hscript expressions used by the OVFX nodes: ch(), chs() and $VARIABLES"""
+    strings = []
+
+    def channel(match):
+        parm = node.parm(match.group(2))
+        value = parm.evalAsString() if match.group(1) == 'chs' else parm.eval()
+        strings.append(value)
+        return '__s{}'.format(len(strings) - 1)
+
+    expr = _CH_RE.sub(channel, expr)
+    expr = _VAR_RE.sub(lambda m: repr(_variable(m.group(1))), expr)
+    namespace = dict(('__s{}'.format(i), s) for i, s in enumerate(strings))
+    return eval(expr, {}, namespace)
+
+
+def _expand(value, node):
+    """Expand the backtick expressions and the variables of a string parm"""
+    parts = value.split('`')
+    for i in range(1, len(parts), 2):
+        parts[i] = str(_hscript(parts[i], node))
+    value = ''.join(parts)
+    return _VAR_RE.sub(lambda m: str(_variable(m.group(1))), value)
+
+
+def _python(expr, node):
+    pwd(node)
+    try:
+        namespace = {'hou': _module(), 'ch': lambda name: node.parm(name).eval(), 'chs': lambda name: node.parm(name).evalAsString()}
+        return eval(expr, namespace)
+    finally:
+        _pwd.pop()
+
+
+def _module():
+    import sys
+    return sys.modules[__name__]
+
+
+# ---------------------------------------------------------------- Parms
+
+class Parm(object):
+
+    def __init__(self, node, name, template, index):
+        self._node = node
+        self._name = name
+        self._template = template
+        self._index = index
+
+    def __repr__(self):
+        return '<hou.Parm {} in {}>'.format(self._name, self._node.path())
+
+    def _state(self):
+        return self._node._values[self._name]
+
+    def name(self):
+        return self._name
+
+    def node(self):
+        return self._node
+
+    def parmTemplate(self):
+        return copy.deepcopy(self._template)
+
+    def tuple(self):
+        return self._node.parmTuple(self._template.name())
+
+    def parentMultiParm(self):
+        return None
+
+    def _raw(self):
+        state = self._state()
+        if state['expression'] is not None:
+            if state['language'] == exprLanguage.Python:
+                return _python(state['expression'], self._node)
+            return _hscript(state['expression'], self._node)
+        return state['value']
+
+    def eval(self):
+        stats['parm_eval'] += 1
+        value = self._raw()
+        data_type = self._template.dataType()
+        if data_type == parmData.String:
+            return _expand(str(value), self._node)
+        if isinstance(value, str) and self._template.menuItems(): # menu token
+            items = self._template.menuItems()
+            return items.index(value) if value in items else int(value)
+        if data_type == parmData.Int:
+            return int(float(value))
+        return float(value)
+
+    def evalAtTime(self, time): # Time dependent values are not modelled
+        return self.eval()
+
+    def evalAsString(self):
+        value = self.eval()
+        items = self._template.menuItems()
+        if items and isinstance(value, int):
+            return items[value] if 0 <= value < len(items) else ''
+        return str(value)
+
+    def evalAsInt(self):
+        return int(self.eval())
+
+    def evalAsFloat(self):
+        return float(self.eval())
+
+    def rawValue(self):
+        state = self._state()
+        if state['expression'] is not None:
+            return state['expression']
+        return str(state['value'])
+
+    def unexpandedString(self):
+        return self.rawValue()
+
+    def expression(self):
+        state = self._state()
+        if state['expression'] is None:
+            raise OperationFailed('Parm has no expression')
+        return state['expression']
+
+    def expressionLanguage(self):
+        return self._state()['language']
+
+    def set(self, value):
+        stats['parm_set'] += 1
+        state = self._state()
+        state['value'] = value
+        state['expression'] = None
+
+    def setExpression(self, expression, language=None, replace_expression=True):
+        stats['parm_set'] += 1
+        state = self._state()
+        state['expression'] = expression
+        state['language'] = language or exprLanguage.Hscript
+
+    def deleteAllKeyframes(self):
+        state = self._state()
+        state['expression'] = None
+
+    def revertToDefaults(self):
+        self._node._values[self._name] = self._node._default_state(self._template, self._index)
+
+    def pressButton(self):
+        callback = self._template.scriptCallback()
+        if callback:
+            pwd(self._node)
+            try:
+                exec(callback, {'hou': _module(), 'kwargs': {'node': self._node, 'parm': self}})
+            finally:
+                _pwd.pop()
+
+
+class ParmTuple(tuple):
+
+    def __new__(cls, parms):
+        return tuple.__new__(cls, parms)
+
+    def eval(self):
+        return tuple(p.eval() for p in self)
+
+    def revertToDefaults(self):
+        for p in self:
+            p.revertToDefaults()
+
+
+# ---------------------------------------------------------------- Nodes
+
+class HDADefinition(object):
+
+    def __init__(self, node_type, parm_template_group, sections=None):
+        self._node_type = node_type
+        self._group = parm_template_group
+        self._sections = dict(sections or {})
+
+    def parmTemplateGroup(self):
+        return ParmTemplateGroup(self._group._entries)
+
+    def sections(self):
+        return dict(self._sections)
+
+    def nodeType(self):
+        return self._node_type
+
+    def libraryFilePath(self):
+        return 'Embedded'
+
+    def version(self):
+        return ''
+
+    def modificationTime(self):
+        return 0
+
+
+class NodeTypeCategory(object):
+
+    def __init__(self, name):
+        self._name = name
+        self._types = {}
+
+    def name(self):
+        return self._name
+
+    def nodeTypes(self):
+        return dict(self._types)
+
+
+_categories = {}
+
+
+def nodeTypeCategories():
+    return dict(_categories)
+
+
+def _category(name):
+    if name not in _categories:
+        _categories[name] = NodeTypeCategory(name)
+    return _categories[name]
+
+
+def sopNodeTypeCategory():
+    return _category('Sop')
+
+
+def objNodeTypeCategory():
+    return _category('Object')
+
+
+class NodeType(object):
+
+    def __init__(self, category, name, parm_template_group=None, python_module=None):
+        self._category = _category(category)
+        self._name = name
+        self._definition = HDADefinition(self, parm_template_group or ParmTemplateGroup())
+        self._python_module = python_module
+        self._hda_module = None
+        self._instances = []
+        self._category._types[name] = self
+
+    def name(self):
+        return self._name
+
+    def nameComponents(self):
+        name, _, version = self._name.partition('::')
+        namespace = ''
+        if '::' in name:
+            namespace, name = name.split('::', 1)
+        return ('', namespace, name, version)
+
+    def category(self):
+        return self._category
+
+    def definition(self):
+        return self._definition
+
+    def instances(self):
+        return tuple(self._instances)
+
+    def hdaModule(self):
+        if self._hda_module is None:
+            module = types.ModuleType('hda_{}'.format(self._name.replace(':', '_')))
+            module.hou = _module()
+            if self._python_module:
+                exec(compile(self._python_module, module.__name__, 'exec'), module.__dict__)
+            self._hda_module = module
+        return self._hda_module
+
+
+class Node(object):
+
+    def __init__(self, node_type, name, parent):
+        _next_session_id[0] += 1
+        self._session_id = _next_session_id[0]
+        _session_ids[self._session_id] = self
+        self._type = node_type
+        self._name = name
+        self._parent = parent
+        self._children = []
+        self._user_data = {}
+        self._values = {}
+        self._group = None
+        self._parms = {}
+        if node_type is not None:
+            node_type._instances.append(self)
+            self._set_group(node_type.definition().parmTemplateGroup())
+
+    def __repr__(self):
+        return '<hou.Node at {}>'.format(self.path())
+
+    def __eq__(self, other):
+        return isinstance(other, Node) and other._session_id == self._session_id
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return self._session_id
+
+    @staticmethod
+    def _default_state(template, index):
+        language = template.defaultExpressionLanguage()[index]
+        expression = template.defaultExpression()[index] or None
+        return {'value': template.defaultValue()[index], 'expression': expression,
+                'language': exprLanguage.Python if language == scriptLanguage.Python else exprLanguage.Hscript}
+
+    def _set_group(self, group):
+        values = self._values
+        self._group = ParmTemplateGroup(group._entries)
+        self._values = {}
+        self._parms = {}
+        for t in self._group._entries:
+            for i, parm_name in enumerate(t.parm_names()):
+                self._parms[parm_name] = (t, i)
+                self._values[parm_name] = values.get(parm_name) or self._default_state(t, i)
+            self._parms.setdefault(t.name(), (t, None))
+
+    def name(self):
+        return self._name
+
+    def path(self):
+        if self._parent is None:
+            return '/'
+        parent_path = self._parent.path()
+        return '{}/{}'.format('' if parent_path == '/' else parent_path, self._name)
+
+    def parent(self):
+        return self._parent
+
+    def type(self):
+        return self._type
+
+    def sessionId(self):
+        return self._session_id
+
+    def children(self):
+        return tuple(self._children)
+
+    def allSubChildren(self):
+        result = []
+        for child in self._children:
+            result.append(child)
+            result.extend(child.allSubChildren())
+        return tuple(result)
+
+    def node(self, path):
+        node = self
+        for part in path.strip('/').split('/'):
+            if part == '..':
+                node = node._parent
+            elif part:
+                node = dict((c._name, c) for c in node._children).get(part)
+            if node is None:
+                return None
+        return node
+
+    def createNode(self, node_type_name, node_name=None):
+        category = 'Sop' if self._type is not None else 'Object'
+        node_type = _category(category)._types.get(node_type_name)
+        if node_type is None:
+            node_type = NodeType(category, node_type_name)
+        node_name = node_name or '{}1'.format(node_type_name.split('::')[0])
+        child = Node(node_type, node_name, self)
+        self._children.append(child)
+        return child
+
+    def destroy(self):
+        for child in list(self._children):
+            child.destroy()
+        if self._parent is not None:
+            self._parent._children.remove(self)
+        if self._type is not None:
+            self._type._instances.remove(self)
+        _session_ids.pop(self._session_id, None)
+
+    def parm(self, name):
+        entry = self._parms.get(name)
+        if entry is None or entry[1] is None:
+            return None
+        return Parm(self, name, entry[0], entry[1])
+
+    def parmTuple(self, name):
+        entry = self._parms.get(name)
+        if entry is None:
+            return None
+        template = entry[0]
+        return ParmTuple([Parm(self, n, template, i) for i, n in enumerate(template.parm_names())])
+
+    def parms(self):
+        return tuple(Parm(self, name, t, i) for name, (t, i) in self._parms.items() if i is not None)
+
+    def evalParm(self, name):
+        return self.parm(name).eval()
+
+    def parmTemplateGroup(self):
+        return ParmTemplateGroup(self._group._entries)
+
+    def setParmTemplateGroup(self, group, rename_conflicting_parms=False):
+        stats['setParmTemplateGroup'] += 1
+        self._set_group(group)
+
+    def userData(self, name):
+        return self._user_data.get(name)
+
+    def setUserData(self, name, value):
+        self._user_data[name] = value
+
+    def destroyUserData(self, name, must_exist=True):
+        del self._user_data[name]
+
+    def userDataDict(self):
+        return dict(self._user_data)
+
+    def hdaModule(self):
+        return self._type.hdaModule()
+
+    def inputConnectors(self):
+        return ((), ())
+
+    def isBypassed(self):
+        return False
+
+
+_root = Node(None, '', None)
+
+
+def node(path):
+    return _root.node(path)
+
+
+def nodeBySessionId(session_id):
+    return _session_ids.get(session_id)
+
+
+def nodeType(category, name=None):
+    if name is None:
+        category, name = category.split('/', 1)
+    if not isinstance(category, NodeTypeCategory):
+        category = _category(category)
+    return category._types.get(name)
+
+
+def pwd(node=None):
+    if node is not None:
+        _pwd.append(node)
+    return _pwd[-1] if _pwd else _root
+
+
+def phm():
+    return pwd().hdaModule()
+
+
+def frame():
+    return _globals['F']
+
+
+def setFrame(frame):
+    _globals['F'] = _globals['FF'] = float(frame)
+
+
+def fps():
+    return 24.0
+
+
+def isUIAvailable():
+    return False
+
+
+def getenv(name, default_value=None):
+    return os.environ.get(name, default_value)
+
+
+def hscript(command):
+    return ('', '')
+
+
+def clear():
+    """Delete every node of the scene"""
+    for child in list(_root._children):
+        child.destroy()
+
+
+class _Text(object):
+
+    @staticmethod
+    def expandString(value):
+        return _VAR_RE.sub(lambda m: str(_variable(m.group(1))), value)
+
+
+text = _Text()
+
+
+class _Take(object):
+
+    def name(self):
+        return 'Main'
+
+
+class _Takes(object):
+
+    def currentTake(self):
+        return _Take()
+
+
+takes = _Takes()
+
+
+class _HipFile(object):
+
+    def isLoadingHipFile(self):
+        return False
+
+    def path(self):
+        return os.path.join(os.getcwd(), 'untitled.hip')
+
+    def hasUnsavedChanges(self):
+        return False
+
+    def isNewFile(self):
+        return False
+
+
+hipFile = _HipFile()
@@ -0,0 +1,2 @@
+"""Stand-in for the Open VFX framework package, only the exceptions are implemented"""
+from ovfx.exceptions import *
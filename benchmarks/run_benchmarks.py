@@ -0,0 +1,167 @@
+"""
+Benchmark roputil and the geometry cache HDA module on a plain Python
+interpreter.
+
+The hou, hdefereval and ovfx modules are replaced by the in-memory fakes of
+the fake folder. Synthetic scenes of N cache nodes with M output presets
+and K-frame sequences on a temporary folder are timed with perf_counter,
+then run once more under tracemalloc to record the allocations.
+
+Usage:
+    python benchmarks/run_benchmarks.py --nodes 100 --presets 3 --frames 1000
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [os.path.join(HERE, 'fake'), HERE, os.path.join(ROOT, 'houdini', 'scripts', 'python')]
+
+import hou
+import roputil
+import scenes
+
+
+class Result(object):
+
+    def __init__(self, name, items, times, peak, blocks, calls):
+
+        self.__name = name
+        self.__items = items
+        self.__times = times
+        self.__peak = peak
+        self.__blocks = blocks
+        self.__calls = calls
+
+    def name(self):
+        return self.__name
+
+    def row(self):
+        best = min(self.__times)
+        return (self.__name,
+                '{:.2f}'.format(best * 1000),
+                '{:.2f}'.format(statistics.median(self.__times) * 1000),
+                '{:.1f}'.format(best / max(self.__items, 1) * 1000000),
+                '{:.1f}'.format(self.__peak / 1024.0),
+                str(self.__blocks),
+                ' '.join('{}={}'.format(k, v) for k, v in sorted(self.__calls.items()) if v))
+
+
+HEADER = ('benchmark', 'best ms', 'median ms', 'us/item', 'peak KB', 'blocks', 'hou calls')
+
+
+def measure(name, func, items, repeat, setup=None):
+    """
+    Time func() repeat times, setup() is called before each run and is not
+    timed. A last run is traced to get the peak memory, the number of
+    memory blocks still allocated after the run and the fake hou calls.
+    """
+    times = []
+    for i in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    for key in hou.stats:
+        hou.stats[key] = 0
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    func()
+    after = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    return Result(name, items, times, peak, blocks, dict(hou.stats))
+
+
+def run(args, cache_root):
+
+    scenes.install_hda()
+    scenes.set_context(cache_root)
+    geo = scenes.configure(presets=args.presets)
+    nodes = []
+
+    def fresh_nodes():
+        nodes[:] = scenes.create_nodes(args.nodes)
+
+    def setup_nodes():
+        fresh_nodes()
+        geo.initialize_nodes()
+
+    def each(func):
+        return lambda: [func(node) for node in nodes]
+
+    results = []
+    def add(name, func, items=args.nodes, setup=setup_nodes, repeat=args.repeat):
+        results.append(measure(name, func, items, repeat, setup))
+        print(format_row(results[-1].row()))
+        sys.stdout.flush()
+
+    print(format_row(HEADER))
+    add('initialize_nodes new', geo.initialize_nodes, setup=fresh_nodes)
+    add('initialize_nodes unchanged', geo.initialize_nodes)
+    add('setup_node forced', each(lambda node: node.hdaModule().setup_node(node, force=True)))
+    add('Parm.apply_preset forced', each(lambda node: geo.parm('sopoutput').apply_preset(node, force=True)))
+    add('Menu.create forced', each(lambda node: geo.menu('sopoutput_menu').create(node, force=True)))
+    add('delete_ovfx_parms', each(roputil.Node.delete_ovfx_parms))
+    add('update_read forced', each(lambda node: node.hdaModule().update_read(node, force=True)))
+
+    frames = list(range(1001, 1001 + args.frames))
+    add('frame_suffix', lambda: [geo.frame_suffix(nodes[0], frame) for frame in frames], items=len(frames))
+
+    # Cache info on a K-frame sequence
+    setup_nodes()
+    nodes[0].hdaModule().update_read(nodes[0], force=True)
+    path = nodes[0].parm('rpath').eval()
+    files = scenes.write_sequence(path, args.frames)
+    add('file_info listing', lambda: roputil.Node.file_info(path), items=args.frames, setup=None)
+    # Recorded like the frames of a render, the manifest is written once the folder is older than the racy window
+    for file_path in files:
+        roputil.CacheManifest.record(file_path)
+    roputil.CacheManifest.flush_pending()
+    add('file_info manifest', lambda: roputil.Node.file_info(path), items=args.frames, setup=None)
+    roputil.scanner.info(path)
+    add('scanner.info cached', lambda: roputil.scanner.info(path), items=args.frames, setup=None)
+    return results
+
+
+def format_row(row):
+    widths = (28, 10, 10, 10, 10, 8, 0)
+    return ''.join(value.ljust(width) if width else value for value, width in zip(row, widths))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark roputil with an in-memory hou module.')
+    parser.add_argument('--nodes', type=int, default=100, help='Number of cache nodes in the scene.')
+    parser.add_argument('--presets', type=int, default=3, help='Number of output presets.')
+    parser.add_argument('--frames', type=int, default=1000, help='Number of frames of the cached sequence.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs of each benchmark.')
+    parser.add_argument('--output', help='Also write the results to this file, e.g. bench_output.txt')
+    args = parser.parse_args()
+
+    cache_root = tempfile.mkdtemp(prefix='ovfx_bench_')
+    try:
+        results = run(args, cache_root)
+    finally:
+        shutil.rmtree(cache_root, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write('nodes={} presets={} frames={} repeat={} python={}\n'.format(
+                args.nodes, args.presets, args.frames, args.repeat, sys.version.split()[0]))
+            for row in [HEADER] + [result.row() for result in results]:
+                f.write(format_row(row).rstrip() + '\n')
+
+
+if __name__ == '__main__':
+    main()
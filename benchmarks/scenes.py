@@ -0,0 +1,123 @@
+"""
+Synthetic OVFX context, configurations and scenes for the benchmarks.
+
+Must be imported after the fake modules are put in front of sys.path, see
+run_benchmarks.py.
+"""
+import os
+import re
+
+import hou
+import hda
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+HDA_PATH = os.path.join(ROOT, 'houdini', 'otls', 'ovfx_Sop_geometry_cache.v01.01.hda')
+
+SHOT = {'proj': 'MyMovie', 'epis': '010', 'seq': '020', 'shot': '0030', 'task': 'fx', 'scene_desc': 'setupA', 'ver': '001'}
+
+OUTPUT_TEMPLATE = ('$OVFX_PACKAGE_ROOT/<proj>/<epis>/<seq>/<shot>/<task>/cache/{ext}/'
+                   '<task>_<scene_desc>_`chs("elem")``chs("tname")``chs("wedge")`/v`chs("wver")`/'
+                   '<proj>_<shot>_<task>_`chs("elem")``chs("tname")``chs("wedge")`_v`chs("wver")``chs("wframe")`.{ext}')
+
+
+class Fragment(object):
+
+    def __init__(self, value):
+        self.__value = value
+
+    def value(self):
+        return self.__value
+
+
+class Bundle(object):
+    """Stand-in for an ovfx bundle: the <fragment> tokens are replaced by the context values"""
+
+    def __init__(self, values):
+        self.__values = values
+
+    def __call__(self, name):
+        return Fragment(self.__values.get(name))
+
+    def frag(self, name):
+        return Fragment(self.__values.get(name))
+
+    def translate(self, template):
+        return re.sub(r'<([a-z_]+)>', lambda m: str(self.__values.get(m.group(1), '')), template)
+
+
+class Location(object):
+
+    def __init__(self, values):
+        self.bundle = Bundle(values)
+
+    def valid(self):
+        return True
+
+
+def install_hda():
+    """Register the geometry cache HDA in the fake hou module"""
+    return hda.install(HDA_PATH)
+
+
+def set_context(cache_root, values=SHOT):
+    """Create hou.ovfx with a shot context, the caches are written in cache_root"""
+    os.environ['OVFX_PACKAGE_ROOT'] = cache_root
+    hou.ovfx = {'loc': {'scene': Location(dict(values))}, 'rop': {}}
+
+
+def configure(presets=3):
+    """
+    Create hou.ovfx['rop']['Sop']['geo'] like the 02_with_presets sample,
+    with a number of output presets on the sopoutput menu.
+    """
+    import roputil
+    scene = hou.ovfx['loc']['scene']
+    hou.ovfx['rop'].setdefault('Sop', {})
+    geo = hou.ovfx['rop']['Sop']['geo'] = roputil.Node(node_category='Sop',
+                                                        node_type='ovfx_geometry_cache',
+                                                        version=scene.bundle('ver').value())
+    sopoutput = geo.add_parm('sopoutput', bound_menu='sopoutput_menu')
+    for i in range(presets):
+        ext = 'bgeo.sc' if i == 0 else 'fmt{}'.format(i)
+        sopoutput.add_preset(ext, scene.bundle.translate(OUTPUT_TEMPLATE.format(ext=ext)))
+    geo.add_menu('sopoutput_menu', '', 'sopoutput', position='join', callback="hou.ovfx['rop']['Sop']['geo'].parm('sopoutput').apply_preset(hou.pwd(), force=True); hou.phm().update_read(hou.pwd())", values=sopoutput.unique_keys(0))
+
+    f = geo.add_parm('f', bound_menu='f_menu')
+    f.add_preset('scene', ('$FSTART', '$FEND', 1), language=('Hscript', 'Hscript', None))
+    f.add_preset('parent', ('ch("../../f1")', 'ch("../../f2")', 1), language=('Hscript', 'Hscript', None))
+    geo.add_menu('f_menu', '', 'f', position='join', callback="hou.ovfx['rop']['Sop']['geo'].parm('f').apply_preset(hou.pwd(), force=True)", values=f.unique_keys(0))
+
+    geo.add_button('browse', 'Browse', 'refreshinfo', position='before', callback="hou.ovfx['rop']['Sop']['geo'].callback('browse')(hou.pwd())")
+    geo.add_button('delete', 'Delete Cache...', 'refreshinfo', position='before', callback="hou.ovfx['rop']['Sop']['geo'].callback('delete_cache')(hou.pwd())")
+    return geo
+
+
+def create_nodes(count):
+    """Clear the scene and create count geometry cache nodes, nothing is set up on them"""
+    import roputil
+    hou.clear()
+    roputil.instances.clear()
+    container = hou.node('/').createNode('geo', 'geo1')
+    return [container.createNode('ovfx_geometry_cache::1', 'cache{}'.format(i)) for i in range(count)]
+
+
+def write_sequence(path, frames, size=1024, first_frame=1001):
+    """
+    Write a sequence of files named after an evaluated read path.
+
+    Returns:
+        The list of file paths
+    """
+    import roputil
+    directory, head, tail = roputil.SeqSnapshot.split(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    data = b'\0' * size
+    files = []
+    for frame in range(first_frame, first_frame + frames):
+        file_path = os.path.join(directory, '{}.{:04d}{}'.format(head, frame, tail))
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        files.append(file_path)
+    return files
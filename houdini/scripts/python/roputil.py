@@ -1,16 +1,315 @@
 """
 Interact with an OVFX Rop node
 """
+import argparse
+import array
+import atexit
+import bisect
 import collections
+import contextlib
+import ctypes
+import ctypes.util
+import functools
+import hashlib
 import hou
-import nodesearch
 import os
 import re
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
 import time
 import importlib
+import inspect
+import json
+import marshal
+import math
+import mmap
+from concurrent import futures
+
+try:
+    import numpy
+except ImportError: # Shipped with Houdini, only needed by roputil.SeqIntegrity
+    numpy = None
+
+try:
+    import yaml
+except ImportError: # Only needed by roputil.RopConfig for the YAML files
+    yaml = None
 
 import ovfx.exceptions
-import ovfx.path
+
+FINGERPRINT_USER_DATA = 'ovfx:fingerprint'
+
+SCANNING_INFO = 'Scanning...'
+
+def digest(*values):
+    """Return a short hash of the values string representation. Used to compare presets stored in user data."""
+    return hashlib.md5(repr(values).encode('utf-8')).hexdigest()
+
+def execute_deferred(func, *args):
+    """
+    Run a function from the Houdini main thread. Used by the worker threads
+    to update the nodes. The function is run right away when there is no UI.
+    """
+    if hou.isUIAvailable():
+        import hdefereval
+        hdefereval.executeDeferred(func, *args)
+    else:
+        func(*args)
+
+
+class Profiler(object):
+    """
+    Opt-in timing of the node setup phases.
+
+    Turned on by setting the OVFX_ROP_PROFILE environment variable before
+    Houdini starts. Every profiled call records its wall time per phase and
+    per node. flush() prints the aggregated report. It is called after each
+    roputil.Node.initialize_nodes(), after a scene is loaded and when
+    Houdini exits. When OVFX_ROP_PROFILE_TRACE is set to a file path, the
+    calls are also written as a Chrome trace that can be opened in
+    chrome://tracing or https://ui.perfetto.dev
+
+    The times are inclusive: a phase includes the phases it calls. The time
+    of a node is the time of its outermost calls.
+
+    By convention a single instance of this object exists: roputil.profiler
+    """
+    ENABLE_ENV = 'OVFX_ROP_PROFILE'
+    TRACE_ENV = 'OVFX_ROP_PROFILE_TRACE'
+    MAX_EVENTS = 500000
+
+    def __init__(self, enabled=False, trace_path=None):
+
+        self.__enabled = enabled
+        self.__trace_path = trace_path
+        self.__lock = threading.Lock()
+        self.__origin = time.perf_counter()
+        self.__phases = {} # {phase name: [call count, total seconds]}
+        self.__nodes = {} # {node path: [call count, total seconds]}
+        self.__events = [] # Chrome trace complete events
+        self.__active = threading.local()
+
+    def enabled(self):
+        return self.__enabled
+
+    def trace_path(self):
+        return self.__trace_path
+
+    def clear(self):
+        with self.__lock:
+            self.__phases.clear()
+            self.__nodes.clear()
+            del self.__events[:]
+
+    def record(self, name, start, duration, node=None, outermost=True):
+        """
+        Add a call that started at start (perf_counter) and lasted duration
+        seconds. Only the outermost call of a node counts in the node time.
+        """
+        with self.__lock:
+            stat = self.__phases.setdefault(name, [0, 0.0])
+            stat[0] += 1
+            stat[1] += duration
+            if node is not None and outermost:
+                stat = self.__nodes.setdefault(node, [0, 0.0])
+                stat[0] += 1
+                stat[1] += duration
+            if self.__trace_path and len(self.__events) < self.MAX_EVENTS:
+                event = {'name': name, 'cat': 'roputil', 'ph': 'X', 'pid': os.getpid(), 'tid': threading.current_thread().ident,
+                         'ts': int((start - self.__origin) * 1000000), 'dur': int(duration * 1000000)}
+                if node is not None:
+                    event['args'] = {'node': node}
+                self.__events.append(event)
+
+    @contextlib.contextmanager
+    def phase(self, name, node=None):
+        """Context manager recording the time of a block of code"""
+        if not self.__enabled:
+            yield
+            return
+        with self.__timed(name, node.path() if node is not None else None):
+            yield
+
+    @contextlib.contextmanager
+    def __timed(self, name, node):
+        active = self.__active.__dict__.setdefault('nodes', set()) # Nodes with a call running in this thread
+        outermost = node not in active
+        if outermost and node is not None:
+            active.add(node)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start, node, outermost)
+            if outermost:
+                active.discard(node)
+
+    def profiled(self, name):
+        """
+        Decorator recording the calls of a function. The first hou.Node
+        argument is used as the node of the call. The function is returned
+        untouched when the profiler is disabled.
+        """
+        def decorator(func):
+            if not self.__enabled:
+                return func
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                node = None
+                for arg in args:
+                    if isinstance(arg, hou.Node):
+                        node = arg.path()
+                        break
+                with self.__timed(name, node):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def report(self, top=10):
+        """Return the phases sorted by total time and the slowest nodes"""
+        with self.__lock:
+            phases = sorted(self.__phases.items(), key=lambda item: item[1][1], reverse=True)
+            nodes = sorted(self.__nodes.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        lines = ['roputil profile (inclusive times)', '{:<32}{:>8}{:>12}{:>12}'.format('phase', 'calls', 'total ms', 'avg ms')]
+        for name, (count, total) in phases:
+            lines.append('{:<32}{:>8}{:>12.2f}{:>12.3f}'.format(name, count, total * 1000, total * 1000 / count))
+        if nodes:
+            lines.append('slowest nodes')
+            for path, (count, total) in nodes:
+                lines.append('  {:<62}{:>8}{:>12.2f}'.format(path, count, total * 1000))
+        return '\n'.join(lines)
+
+    def write_trace(self, path=None):
+        """Write the Chrome trace of every call recorded so far"""
+        path = path or self.__trace_path
+        with self.__lock:
+            events = list(self.__events)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    def flush(self):
+        """Print the report, write the trace and start a new report"""
+        if not self.__enabled or not self.__phases:
+            return
+        print(self.report())
+        if self.__trace_path:
+            self.write_trace()
+        with self.__lock:
+            self.__phases.clear()
+            self.__nodes.clear()
+
+profiler = Profiler(enabled=bool(os.environ.get(Profiler.ENABLE_ENV)), trace_path=os.environ.get(Profiler.TRACE_ENV))
+
+def profiled(name):
+    """Shortcut of roputil.profiler.profiled()"""
+    return profiler.profiled(name)
+
+if profiler.enabled():
+    atexit.register(profiler.flush)
+    if hasattr(hou.hipFile, 'addEventCallback'):
+        def _flush_after_load(event_type):
+            if event_type == hou.hipFileEventType.AfterLoad:
+                profiler.flush()
+        hou.hipFile.addEventCallback(_flush_after_load)
+
+class Preset(object):
+    """
+    A preset of a roputil.Parm compiled when it is added: the value split
+    into its components and the expression languages resolved once to the
+    hou enums, so applying it evaluates nothing.
+    """
+    __slots__ = ('__key', '__value', '__language', '__components', '__expr_languages', '__script_languages')
+
+    def __init__(self, key, value, language=None):
+        """
+        Args:
+            key (str | tuple)        : The menu selection of the preset.
+            value                    : The value, a tuple for a parm tuple.
+            language (str | tuple)   : 'Hscript' or 'Python' when the value is an expression, a tuple
+                                       with one language or None per component for a parm tuple.
+        """
+        self.__key = key
+        self.__value = value
+        self.__language = language
+        self.__components = tuple(value) if isinstance(value, (tuple, list)) else (value,)
+        if language is None or isinstance(language, str): # Same language for every component
+            languages = (language,) * len(self.__components)
+        else:
+            languages = tuple(language)
+        if len(languages) != len(self.__components):
+            raise ValueError('The preset {} has {} component(s) but {} language(s)'.format(key, len(self.__components), len(languages)))
+        self.__expr_languages = tuple(self.resolve(hou.exprLanguage, name) for name in languages)
+        self.__script_languages = tuple(self.resolve(hou.scriptLanguage, name) for name in languages)
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} {} components={}>'.format(cl.__module__, cl.__name__, self.__key, len(self.__components))
+        return result
+
+    @staticmethod
+    def resolve(enum, name):
+        """Return the member of a hou language enum from its name, None for a value"""
+        if not name:
+            return None
+        try:
+            return getattr(enum, name)
+        except AttributeError:
+            raise ValueError('Unknown expression language: {}'.format(name))
+
+    def key(self):
+        return self.__key
+
+    def value(self):
+        return self.__value
+
+    def language(self):
+        """The language as it was given to roputil.Parm.add_preset()"""
+        return self.__language
+
+    def components(self):
+        return self.__components
+
+    def expr_languages(self):
+        """The hou.exprLanguage of each component, None for a value"""
+        return self.__expr_languages
+
+    def script_languages(self):
+        """The hou.scriptLanguage of each component, None for a value"""
+        return self.__script_languages
+
+    def has_expression(self):
+        return any(self.__expr_languages)
+
+    @staticmethod
+    def set_component(parm, value, language):
+        """
+        Set a value or an expression on a parm. Nothing is done when the parm
+        already holds it, so its keyframes are not deleted and set again.
+
+        Returns:
+            True if the parm was modified
+        """
+        try:
+            expression = parm.expression()
+        except hou.OperationFailed: # No keyframe
+            expression = None
+        if language is not None: # is an expression
+            if expression == value and parm.expressionLanguage() == language:
+                return False
+            parm.deleteAllKeyframes()
+            parm.setExpression(value, language=language)
+        else: # direct value
+            if expression is None and (parm.rawValue() if isinstance(value, str) else parm.eval()) == value:
+                return False
+            if expression is not None:
+                parm.deleteAllKeyframes()
+            parm.set(value)
+        return True
+
 
 class Parm(object):
 
@@ -18,9 +317,10 @@ class Parm(object):
 
         self.__node = node # A roputil.Node instance
         self.__name = name
-        self.__presets = collections.OrderedDict()
-        self.__languages = collections.OrderedDict()
+        self.__presets = collections.OrderedDict() # {key: roputil.Preset}
+        self.__is_template = False
         self.__bound_menu = bound_menu # a single menu parm name or a tuple of parm names
+        self.__digest = None # digest of the signature, computed once
 
     def __repr__(self):
         cl = self.__class__
@@ -40,6 +340,9 @@ class Parm(object):
     def name(self):
         return self.__name
 
+    def is_template(self):
+        return self.__is_template
+
     def unique_keys(self, index=0):
 
         values = []
@@ -53,51 +356,63 @@ class Parm(object):
         return values
 
     def add_preset(self, key, value, language=None, is_template=False):
+        """
+        Add a preset selected by key from the bound menu(s). The languages are
+        resolved and the number of components checked right away.
 
-        preset = value
+        Raises:
+            ValueError: the languages or the number of components don't match the other presets.
+        """
+        preset = Preset(key, value, language)
+        other = next((other for other in self.__presets.values() if other.key() != key), None)
+        if other is not None and len(other.components()) != len(preset.components()):
+            raise ValueError('The preset {} of {} has {} component(s), the other presets have {}'.format(
+                key, self.__name, len(preset.components()), len(other.components())))
         self.__presets[key] = preset
-        self.__languages[key] = language
         self.__is_template = is_template
+        self.__digest = None
 
     def __get_menu_selection(self, node):
         """Get the selected value(s) from the menu(s) bound to this parm"""
+        def selection(parm_name):
+            parm = node.parm(parm_name)
+            if parm is None: # The menu is not created yet, it will be initialized on its first value
+                return self.__node.menu(parm_name).values()[0]
+            return parm.evalAsString()
+
         if self.__bound_menu is None:
             return None #raise KeyError('Cannot extract the selected value from a menu. Make sure a menu is bound to parameter: {}'.format(self.__name))
         elif type(self.__bound_menu) == str: # Single menu
-            return node.parm(self.__bound_menu).evalAsString()
+            return selection(self.__bound_menu)
         else: # a tuple or list
             result = []
             for parm_name in self.__bound_menu:
-                result.append(node.parm(parm_name).evalAsString())
+                result.append(selection(parm_name))
             return tuple(result)
 
-    def apply_preset(self, node, force=False):
-
-        key = self.__get_menu_selection(node)
-        # Utility functions
-        def set_value(parm, value, language):
-            parm.deleteAllKeyframes()
-            if language: # is an expression
-                language = eval('hou.exprLanguage.{}'.format(language))
-                parm.setExpression(value, language=language)
-            else: # direct value
-                parm.set(value)
+    @profiled('Parm.apply_preset')
+    def apply_preset(self, node, force=False, group=None):
+        """
+        Apply the preset selected from the bound menu(s) on the node parameter.
 
-        def revert_to_default(parm_name):
-            parm = node.parm(parm_name)
-            if not parm: # Try with parmTuple instead
-                parm = node.parmTuple(self.__name)
-            parm.revertToDefaults()
+        When a parmTemplateGroup is given, template presets only modify that
+        group. It's then up to the caller to commit the group on the node and
+        call revert_to_defaults() so the parm picks up its new default value.
 
-        # Main code
+        Returns:
+            True if the preset was applied, False if it was already up to date.
+        """
+        key = self.__get_menu_selection(node)
         if not key in self.__presets:
             raise KeyError('No preset found in {} for key {}'.format(self, key))
         if force or self.outdated(node):
+            preset = self.__presets[key]
+            components = preset.components()
             if self.__is_template: # Set the default value on the parmTemplate instead
-                g = node.parmTemplateGroup()
+                g = node.parmTemplateGroup() if group is None else group
                 t = g.find(self.__name)
                 if t: # sometimes the parameter is destroyed so we have to skip it
-                    if self.__languages[key]: # At least one component has an expression
+                    if preset.has_expression(): # At least one component has an expression
                         if t.dataType() == hou.parmData.String:
                             default_value = ['' for i in range(t.numComponents())] # ['', '', etc]
                         else:
@@ -105,52 +420,83 @@ class Parm(object):
                         default_expr = ['' for i in range(t.numComponents())] # ['', '', etc]
                         default_language = [hou.scriptLanguage.Hscript for i in range(t.numComponents())] # ['', '', etc]
 
-                        for i in range(len(self.__presets[key])):
-                            language = self.__languages[key][i]
+                        for i, (value, language) in enumerate(zip(components, preset.script_languages())):
                             if language:
-                                default_language[i] = eval('hou.scriptLanguage.{}'.format(language))
-                                default_expr[i] = self.__presets[key][i]
+                                default_language[i] = language
+                                default_expr[i] = value
                             else:
-                                default_value[i] = self.__presets[key][i]
+                                default_value[i] = value
 
                         t.setDefaultValue(tuple(default_value))
                         t.setDefaultExpression(tuple(default_expr))
                         t.setDefaultExpressionLanguage(tuple(default_language))
                     else: # empty the expression tuple
-                        t.setDefaultValue(self.__presets[key])
-                        t.setDefaultExpression(tuple(['' for i in range(len(self.__presets))]))
+                        t.setDefaultValue(components)
+                        t.setDefaultExpression(tuple(['' for i in range(t.numComponents())]))
                     g.replace(self.__name, t)
-                    node.setParmTemplateGroup(g)
-                    # Revert the parm to the default value we just set
-                    if '#' in self.__name: # it's a multiparm. We need to go through each instances of that parm
-                        first_parm = node.parm(self.__name.replace('#', '1'))
-                        if first_parm:
-                            for i in range(first_parm.parentMultiParm().eval()): # each multiparm instance
-                                revert_to_default(self.__name.replace('#', str(i+1)))
-                    else: # single parm
-                        revert_to_default(self.__name)
-            else: # Set the value directly on the parm
+                    if group is None: # Commit right away
+                        node.setParmTemplateGroup(g)
+                        self.revert_to_defaults(node)
+            else: # Set the value directly on the parm, unchanged components are left alone
                 parm = node.parm(self.__name)
                 if parm: # a single parm
-                    set_value(parm, self.__presets[key] , self.__languages[key])
+                    Preset.set_component(parm, preset.value(), preset.expr_languages()[0])
                 else: # Try with a tuple
                     parm = node.parmTuple(self.__name)
                     if parm:
-                        for i in range(len(parm)):
-                            set_value(parm[i], self.__presets[key][i], self.__languages[key][i])
+                        for i, (value, language) in enumerate(zip(components, preset.expr_languages())):
+                            if i < len(parm):
+                                Preset.set_component(parm[i], value, language)
             self.reset_outdated(node)
+            return True
+        return False
+
+    def revert_to_defaults(self, node):
+        """Revert the parm, or each instance of a multiparm, to the default value set by a template preset"""
+        def revert_to_default(parm_name):
+            parm = node.parm(parm_name)
+            if not parm: # Try with parmTuple instead
+                parm = node.parmTuple(self.__name)
+            if parm: # sometimes the parameter is destroyed so we have to skip it
+                parm.revertToDefaults()
+
+        if '#' in self.__name: # it's a multiparm. We need to go through each instances of that parm
+            first_parm = node.parm(self.__name.replace('#', '1'))
+            if first_parm:
+                for i in range(first_parm.parentMultiParm().eval()): # each multiparm instance
+                    revert_to_default(self.__name.replace('#', str(i+1)))
+        else: # single parm
+            revert_to_default(self.__name)
 
     def preset(self, key):
-        return self.__presets[key]
+        return self.__presets[key].value()
 
     def presets(self):
+        """Return the roputil.Preset of each key"""
         return self.__presets
 
+    def signature(self):
+        """Everything that defines this parm presets, used to detect configuration changes"""
+        presets = self.__presets.values()
+        return (self.__name, self.__bound_menu, self.__is_template,
+                [(preset.key(), preset.value()) for preset in presets], [(preset.key(), preset.language()) for preset in presets])
+
+    def digest(self):
+        """Return the digest of the signature, computed again only after a preset is added"""
+        if self.__digest is None:
+            self.__digest = digest(self.signature())
+        return self.__digest
+
+    def to_dict(self):
+        """Return the parm definition as JSON compatible data, see roputil.Node.from_dict()"""
+        presets = [[preset.key(), preset.value(), preset.language()] for preset in self.__presets.values()]
+        return {'name': self.__name, 'bound_menu': self.__bound_menu, 'is_template': self.__is_template, 'presets': presets}
+
     def reset_outdated(self, node):
-        node.setUserData('ovfx:presets:{}'.format(self.__name), str(self.__presets))
+        node.setUserData('ovfx:presets:{}'.format(self.__name), self.digest())
 
     def outdated(self, node):
-        if str(node.userData('ovfx:presets:{}'.format(self.__name))) == str(self.__presets): # keep the existing if nothing has changed.
+        if node.userData('ovfx:presets:{}'.format(self.__name)) == self.digest(): # keep the existing if nothing has changed.
             return False
         else:
             return True
@@ -194,14 +540,39 @@ class Menu(object):
     def values(self):
         return self.__values
 
-    def create(self, node, force=False):
+    def signature(self):
+        """Everything that defines this menu, used to detect configuration changes"""
+        return (self.__name, self.__label, self.__adjacent_parm, self.__position, self.__script, list(self.__values))
+
+    def to_dict(self):
+        """Return the menu definition as JSON compatible data, see roputil.Node.from_dict()"""
+        return {'name': self.__name, 'label': self.__label, 'adjacent_parm': self.__adjacent_parm, 'position': self.__position, 'callback': self.__script, 'values': list(self.__values)}
+
+    def selection(self, node):
+        """Return the selected value on the node or None if the menu is not created yet"""
+        parm = node.parm(self.__name)
+        if parm is None:
+            return None
+        return parm.evalAsString()
+
+    def outdated(self, node):
+        """Whether the menu values changed since the menu was last created on the node"""
+        return node.userData('ovfx:presets:{}'.format(self.__name)) != digest(self.__values)
+
+    @profiled('Menu.create')
+    def create(self, node, force=False, group=None):
+        """
+        Create the menu on the node if it doesn't exist or if its values changed.
 
+        When a parmTemplateGroup is given, the menu is only added to that group
+        and the caller is responsible for committing it on the node.
+        """
         user_data_name = 'ovfx:presets:{}'.format(self.__name)
         create_menu = True
-        g = node.parmTemplateGroup()
+        g = node.parmTemplateGroup() if group is None else group
         existing_parm = g.find(self.__name)
         if existing_parm:
-            if node.userData(user_data_name) == str(self.__values): # keep the existing if nothing has changed.
+            if not self.outdated(node): # keep the existing if nothing has changed.
                 create_menu = False
 
         result = False
@@ -229,8 +600,9 @@ class Menu(object):
                 # Apply the parmTemplateGroup
                 g.replace(self.__adjacent_parm, t)
 
-            node.setParmTemplateGroup(g)
-            node.setUserData(user_data_name, str(self.__values))
+            if group is None: # Commit right away
+                node.setParmTemplateGroup(g)
+            node.setUserData(user_data_name, digest(self.__values))
             result = True
         return result
 
@@ -253,9 +625,23 @@ class Button(object):
     def name(self):
         return self.__name
 
-    def create(self, node):
+    def signature(self):
+        """Everything that defines this button, used to detect configuration changes"""
+        return (self.__name, self.__label, self.__adjacent_parm, self.__position, self.__script)
 
-        g = node.parmTemplateGroup()
+    def to_dict(self):
+        """Return the button definition as JSON compatible data, see roputil.Node.from_dict()"""
+        return {'name': self.__name, 'label': self.__label, 'adjacent_parm': self.__adjacent_parm, 'position': self.__position, 'callback': self.__script}
+
+    @profiled('Button.create')
+    def create(self, node, group=None):
+        """
+        (Re)create the button on the node.
+
+        When a parmTemplateGroup is given, the button is only added to that group
+        and the caller is responsible for committing it on the node.
+        """
+        g = node.parmTemplateGroup() if group is None else group
         existing_parm = g.find(self.__name)
         if existing_parm:
             if g.find(self.__name):
@@ -280,203 +666,3653 @@ class Button(object):
             t.setJoinWithNext(True)
             g.replace(self.__adjacent_parm, t)
 
-        node.setParmTemplateGroup(g)
+        if group is None: # Commit right away
+            node.setParmTemplateGroup(g)
 
 
-class Node(object):
+class InstanceRegistry(object):
     """
-    Used to hold file cache settings and manage nodes refresh
+    Keep track of the OVFX Rop node instances found in the scene so they can
+    be listed without walking the whole scene graph.
 
-    By convention an instance of this object is created on the hou object, e.g hou.ovfx['rop']['Sop']['geo'], hou.ovfx['rop']['Driver'], hou.ovfx['rop']['Sop']['abc']
+    The registry is kept up to date by the OnCreated, OnLoaded and OnDeleted
+    event handlers of each HDA. Nodes are stored by session id so nodes that
+    disappeared without an OnDeleted event (new scene, scene load) are simply
+    dropped. If a node type was never registered, the Houdini node type
+    instances are used to seed the registry.
+
+    It also holds the nodes marked dirty by a deferred
+    roputil.Node.initialize_nodes(). They are set up by flush(): when they
+    are selected, before their write ROPs render, before the scene is saved
+    or when flush() is called explicitly.
+
+    By convention a single instance of this object exists: roputil.instances
     """
 
-    def __init__(self, node_category, node_type, version=1, version_padding=3, frame_padding=4, element_separator='-'):
+    def __init__(self):
 
-        self.__node_category = node_category
-        self.__node_type = node_type
-        self.__version = version
-        self.__version_padding = version_padding
-        self.__frame_padding = frame_padding
-        self.__element_separator = element_separator
+        self.__instances = {} # {(category, type name): OrderedDict({session id: None})}
+        self.__dirty = collections.OrderedDict() # {session id: roputil.Node that sets it up}
+        self.__selection_callback = False
+        self.__save_callback = False
+        self.__render_callbacks = {} # {ROP session id: dirty node session id}
 
-        self.__paths = collections.OrderedDict()
-        self.__frame_ranges = collections.OrderedDict()
-        self.__callbacks = {}
+    @staticmethod
+    def key(node):
+        """Return the (category, type name) key of a node. The type name excludes the namespace and version."""
+        node_type = node.type()
+        return (node_type.category().name(), node_type.nameComponents()[2])
 
-        self.__parms = []
-        self.__menus = []
-        self.__buttons = []
+    def register(self, node):
+        self.__instances.setdefault(self.key(node), collections.OrderedDict())[node.sessionId()] = None
 
-    def initialize_nodes(self):
-        """
-        Iterates through all nodes of the specified type in the scene and
-        and run the initialize setup if the Auto Update parameter is checked.
+    def unregister(self, node):
+        session_ids = self.__instances.get(self.key(node))
+        if session_ids is not None:
+            session_ids.pop(node.sessionId(), None)
+        self.__dirty.pop(node.sessionId(), None)
 
-        This is usually run when the shot/asset context is updated.
+    def clear(self):
+        self.__instances.clear()
+        self.__dirty.clear()
+
+    def mark_dirty(self, definition, nodes):
         """
-        matcher = nodesearch.NodeType(self.__node_type, self.__node_category)
-        for node in matcher.nodes(hou.node('/'), recursive=True):
-            if node.parm('autoupdate').eval() == True:
-                node.hdaModule().setup_node(node)
+        Mark nodes to be set up later by a roputil.Node definition. The nodes
+        are flushed before their write ROPs render, before the scene is saved
+        and, when the UI is available, as soon as they are selected.
+        """
+        for node in nodes:
+            self.__dirty[node.sessionId()] = definition
+            for rop_node in self.write_rops(node):
+                if rop_node.sessionId() not in self.__render_callbacks:
+                    rop_node.addRenderEventCallback(self.__flush_render)
+                    self.__render_callbacks[rop_node.sessionId()] = node.sessionId()
+        if nodes and not self.__selection_callback and hou.isUIAvailable():
+            hou.ui.addSelectionCallback(self.__flush_selection)
+            self.__selection_callback = True
+        if nodes and not self.__save_callback and hasattr(hou.hipFile, 'addEventCallback'):
+            hou.hipFile.addEventCallback(self.__flush_save)
+            self.__save_callback = True
 
     @staticmethod
-    def cleanup_user_data(node):
+    def write_rops(node):
+        """Return the ROPs rendering a node: the node itself if it is a ROP, its ROP children otherwise"""
+        if isinstance(node, hou.RopNode):
+            return [node]
+        return [child for child in node.children() if isinstance(child, hou.RopNode)]
+
+    def is_dirty(self, node):
+        return node.sessionId() in self.__dirty
+
+    def dirty_nodes(self):
+        """Return the live nodes waiting for their setup"""
+        return [node for node in (hou.nodeBySessionId(session_id) for session_id in self.__dirty) if node is not None]
+
+    def flush(self, node=None, definition=None):
         """
-        Remove all user data related to this class.
+        Set up the dirty nodes.
 
-        The cleanup needs to happen when a new node instance is created to
-        prevent having old data from the original node used to save the HDA.
+        Args:
+            node (hou.Node)               : Only flush this node.
+            definition (roputil.Node)     : Only flush the nodes of this definition.
+
+        Returns:
+            A roputil.InitializeReport of the flushed nodes
         """
-        for key in node.userDataDict().keys():
-            ovfx_key = 'ovfx:presets:'
-            if key[:len(ovfx_key)] == ovfx_key:
-                node.destroyUserData(key)
+        report = InitializeReport()
+        if node is not None:
+            session_ids = [node.sessionId()] if node.sessionId() in self.__dirty else []
+        else:
+            session_ids = [session_id for session_id, d in self.__dirty.items() if definition is None or d is definition]
+        fingerprints = {} # {id(roputil.Node): definition fingerprint}, computed once per definition
+        for session_id in session_ids:
+            dirty_definition = self.__dirty.pop(session_id)
+            dirty_node = hou.nodeBySessionId(session_id)
+            if dirty_node is not None: # Not deleted in the meantime
+                if id(dirty_definition) not in fingerprints:
+                    fingerprints[id(dirty_definition)] = dirty_definition.definition_fingerprint()
+                dirty_definition.setup_if_outdated(dirty_node, report, fingerprints[id(dirty_definition)])
+        return report
 
-    @staticmethod
-    def delete_ovfx_parms(node):
+    def __flush_selection(self, selection):
+        for node in selection:
+            if node.sessionId() in self.__dirty:
+                self.flush(node)
+
+    def __flush_save(self, event_type):
+        # The saved scene must hold the set up nodes, they are not marked dirty when it is loaded again
+        if event_type == hou.hipFileEventType.BeforeSave:
+            self.flush()
+
+    def __flush_render(self, rop_node, event_type, time):
+        # Also covers the renders that don't go through the node buttons, e.g. a fetch ROP or a farm submission
+        if event_type != hou.ropRenderEventType.PreRender:
+            return
+        session_id = self.__render_callbacks.pop(rop_node.sessionId(), None)
+        rop_node.removeRenderEventCallback(self.__flush_render)
+        node = hou.nodeBySessionId(session_id) if session_id is not None else None
+        if node is not None and node.sessionId() in self.__dirty:
+            self.flush(node)
+
+    def nodes(self, node_category, node_type):
         """
-        Delete all spare parameters with the tag attribute is_ovfx_parm=1.
+        Return all the live nodes of the given type, e.g. nodes('Sop', 'ovfx_geometry_cache')
+        """
+        key = (node_category, node_type)
+        return self.nodes_by_type([key])[key]
 
-        This tag attribute is attribute is added to all dynamic parameters created
-        by the ovfx tool like preset menus or push buttons.
+    def nodes_by_type(self, keys):
         """
-        g = node.parmTemplateGroup()
-        for p in node.parms():
-            if 'is_ovfx_parm' in p.parmTemplate().tags():
-                if 'ovfx_join_parm' in p.parmTemplate().tags():
-                    join_parm_name = p.parmTemplate().tags()['ovfx_join_parm']
-                    t = g.find(join_parm_name)
-                    if t is not None: # the parameter might have already been removed
-                        t.setJoinWithNext(False) # Uncheck the join with next parm
-                        g.replace(join_parm_name, t)
-                g.remove(p.parmTemplate()) # Remove the parm
-        node.setParmTemplateGroup(g)
+        Return the live nodes of several types at once.
+
+        Args:
+            keys (list)     : (category, type name) keys, e.g. [('Sop', 'ovfx_geometry_cache')]
+
+        Returns:
+            {(category, type name): [hou.Node]}
+        """
+        missing = [key for key in keys if not self.__instances.get(key)]
+        if missing: # Never registered, seed them from the Houdini node types
+            for key, nodes in self.types_instances(missing).items():
+                session_ids = self.__instances[key] = collections.OrderedDict()
+                for node in nodes:
+                    session_ids[node.sessionId()] = None
+
+        result = {}
+        for key in keys:
+            session_ids = self.__instances[key]
+            result[key] = []
+            for session_id in list(session_ids):
+                node = hou.nodeBySessionId(session_id)
+                if node is None: # Deleted or from a previous scene
+                    del session_ids[session_id]
+                else:
+                    result[key].append(node)
+        return result
+
+    @classmethod
+    def type_instances(cls, node_category, node_type):
+        """Return the instances of all the versions of a node type using the Houdini node types"""
+        return cls.types_instances([(node_category, node_type)])[(node_category, node_type)]
 
     @staticmethod
-    def file_info(path, show_size=True):
+    def types_instances(keys):
         """
-        Return the file information like the frame count, frame range and
-        date range of the files found on disk that match the input path
+        Return {(category, type name): [hou.Node]} for all the versions of
+        several node types, walking the node types of each category once.
         """
-        def file_date(path):
-            return time.ctime(os.path.getmtime(path))
+        result = dict((key, []) for key in keys)
+        type_names = {} # {category: set(type names)}
+        for node_category, node_type in keys:
+            type_names.setdefault(node_category, set()).add(node_type)
+        categories = hou.nodeTypeCategories()
+        for node_category, names in type_names.items():
+            category = categories.get(node_category)
+            if category is not None:
+                for t in category.nodeTypes().values():
+                    name = t.nameComponents()[2]
+                    if name in names:
+                        result[(node_category, name)].extend(t.instances())
+        return result
 
-        seq = ovfx.path.Seq(path)
-        info = 'No Files Found'
-        count = seq.count()
+instances = InstanceRegistry()
 
-        if count:
-            info = 'Total File(s): {}'.format(count)
-            if count == 1:
-                if seq.is_seq():
-                    info += '\nFrame        : {}'.format(seq.first_frame())
-                else: # Static Frame
-                    info += '\nFrame        : Static'
-                if show_size:
-                    info += '\nSize         : {}'.format(seq.size())
-                info += '\nDate         : {}'.format(file_date(seq.files()[0]))
-            else: # more than one file
-                info += '\nFrames       : {} - {}'.format(seq.first_frame(), seq.last_frame())
-                if show_size:
-                    info += '\nSize         : {}'.format(seq.size())
-                info += '\nDate     From: {}'.format(file_date(seq.files()[0]))
-                info += '\n           To: {}'.format(file_date(seq.files()[-1]))
-                time_diff = os.path.getmtime(seq.files()[-1]) - os.path.getmtime(seq.files()[0])
-                hour = int(time_diff / 3600)
-                minute = int((time_diff - (hour * 3600)) / 60)
-                second = round(time_diff - (hour * 3600) - (minute * 60))
-                info += '\n     Time Diff: {}h {}m {}s'.format(hour, minute, second)
-        return info
 
-    def format_version(self, version):
+class TypeRegistry(object):
+    """
+    Central index of the roputil.Node definitions by (category, type name)
+    and by the name they are known by in hou.ovfx['rop'], e.g. ('Sop', 'geo').
+
+    A studio usually has one configuration script per Rop type (geometry,
+    alembic, vdb...). Instead of having each script set up its own nodes,
+    the scripts register their definition and call schedule_initialize().
+    With a UI, every type registered during the context change is then set
+    up in a single initialize_nodes() pass once the scripts are done.
+
+    By convention a single instance of this object exists: roputil.types
+    """
+
+    def __init__(self):
+
+        self.__definitions = collections.OrderedDict() # {(category, type name): roputil.Node}
+        self.__names = {} # {(category, name): (category, type name)}
+        self.__pending = collections.OrderedDict() # {(category, type name): None} waiting for initialize_nodes()
+        self.__scheduled = False
+        self.__enabled = True
+
+    @staticmethod
+    def key(definition):
+        return (definition.node_category(), definition.node_type())
+
+    def register(self, definition, name=None):
         """
-        Return the version with the padding. Uses the instance number of padding "version_padding"
+        Register a roputil.Node definition, replacing the previous one of
+        the same node type.
 
         Args:
-            version (int | string)       : The integer version you want to format with padding.
-
-        Returns:
-            Padded version, e.g. 011
+            definition (roputil.Node)    : The definition.
+            name (str)                   : Also publish it as hou.ovfx['rop'][category][name] for the HDA callbacks.
         """
-        if type(version) == str: # convert the string to an int to get rid of existing padding
-            version = int(version)
-        version = str(version)
+        key = self.key(definition)
+        self.__definitions[key] = definition
+        self.__pending[key] = None
+        if name is not None:
+            self.__names[(key[0], name)] = key
+            if hasattr(hou, 'ovfx'):
+                hou.ovfx['rop'].setdefault(key[0], {})[name] = definition
 
-        return version.zfill(self.__version_padding)
+    def unregister(self, definition):
+        key = self.key(definition)
+        if self.__definitions.get(key) is definition:
+            del self.__definitions[key]
+            self.__pending.pop(key, None)
+            for name_key in [name_key for name_key, value in self.__names.items() if value == key]:
+                del self.__names[name_key]
 
-    def add_parm(self, name, bound_menu=None):
-        if name in self.__parms: # Delete the existing so we can recreate it
-            self.__parms.remove(name)
-        parm = Parm(self, name, bound_menu)
-        self.__parms.append(parm)
-        return parm
+    def clear(self):
+        self.__definitions.clear()
+        self.__names.clear()
+        self.__pending.clear()
 
-    def parm(self, name):
-        if name not in self.__parms:
-            raise KeyError('roputil.Parm "{}" cannot be found in roputil.Node "{}".'.format(name, self))
-        return self.__parms[self.__parms.index(name)]
+    def definition(self, node_category, name):
+        """Return the roputil.Node registered for a hou.ovfx name or a node type name, e.g. definition('Sop', 'geo')"""
+        key = self.__names.get((node_category, name), (node_category, name))
+        return self.__definitions.get(key)
 
-    def parms(self):
-        return self.__parms
+    def definition_of(self, node):
+        """Return the roputil.Node of a Houdini node or None"""
+        return self.__definitions.get(InstanceRegistry.key(node))
 
-    def add_menu(self, name, label, adjacent_parm ,position='join', callback=None, values=[]):
-        if name not in self.__menus: # make sure it doesn't already exists
-            self.__menus.append(Menu(name, label, adjacent_parm, position, callback, values))
+    def definitions(self):
+        return list(self.__definitions.values())
 
-    def menu(self, name):
-        if name in self.__menus:
-            index = self.__menus.index(name)
-            return self.__menus[index]
+    def set_enabled(self, enabled):
+        """
+        Turn off the node setup, e.g. in the processes of a parallel render
+        that load a scene already set up by the session that saved it.
+        """
+        self.__enabled = enabled
 
-    def menus(self):
-        return self.__menus
+    def enabled(self):
+        return self.__enabled
 
-    def create_menus(self, node, force=False):
-        for menu in self.menus():
-            if menu.create(node, force=force): # The menu was successfully (re)created
-                node.parm(menu.name()).set(0) # Every time a menu is recreated we initialize the selection
+    def initialize_nodes(self, definitions=None):
+        """
+        Set up the nodes of several types in a single pass: the instances
+        of every type are fetched at once, the definition fingerprints are
+        computed once per type, then each node is set up if outdated.
+        Deferred definitions only mark their nodes dirty.
 
-    def add_button(self, name, label, adjacent_parm ,position='join', callback=None):
-        if name not in self.__menus: # make sure it doesn't already exists
-            self.__buttons.append(Button(name, label, adjacent_parm, position, callback))
+        Args:
+            definitions (list)     : roputil.Node definitions, all the registered ones if None.
 
-    def button(self, name):
-        if name in self.__buttons:
-            index = self.__buttons.index(name)
-            return self.__buttons[index]
+        Returns:
+            A roputil.InitializeReport of all the nodes
+        """
+        if definitions is None:
+            definitions = self.definitions()
+        report = InitializeReport()
+        if not self.__enabled:
+            return report
+        with profiler.phase('Node.initialize_nodes'):
+            keyed = [(self.key(definition), definition) for definition in definitions]
+            nodes = instances.nodes_by_type([key for key, definition in keyed])
+            for key, definition in keyed:
+                self.__pending.pop(key, None)
+                if definition.deferred():
+                    instances.mark_dirty(definition, nodes[key])
+                    for node in nodes[key]:
+                        report.add_deferred(node)
+                else:
+                    fingerprint = definition.definition_fingerprint()
+                    for node in nodes[key]:
+                        definition.setup_if_outdated(node, report, fingerprint)
+        profiler.flush() # Print the profile report when OVFX_ROP_PROFILE is set
+        return report
 
-    def buttons(self):
-        return self.__buttons
+    def schedule_initialize(self):
+        """
+        Set up the nodes of the types registered since the last
+        initialize_nodes(). With a UI it runs once after the current
+        configuration scripts, so several scripts share a single pass.
+        Without a UI it runs right away.
+        """
+        if not hou.isUIAvailable():
+            self.initialize_pending()
+        elif not self.__scheduled:
+            self.__scheduled = True
+            execute_deferred(self.initialize_pending)
 
-    def add_callback(self, parm_name, func):
-        self.__callbacks[parm_name] = func
+    def initialize_pending(self):
+        self.__scheduled = False
+        definitions = [self.__definitions[key] for key in self.__pending if key in self.__definitions]
+        self.__pending.clear()
+        return self.initialize_nodes(definitions)
 
-    def callback(self, parm_name):
-        if parm_name in self.__callbacks:
-            return self.__callbacks[parm_name]
+types = TypeRegistry()
 
-    def callbacks(self):
-        return self.__callbacks
 
-    def version_padding(self):
-        return self.__version_padding
+class CacheManifest(object):
+    """
+    Small file kept in a cache version folder that lists every file in it
+    with its size and modification time, so the cache info is read without
+    listing the folder.
 
-    def version(self):
-        return self.__version
+    The manifest is written by the renders of the current session: the
+    frames written are recorded from the PostWrite events and the folder is
+    listed once, in a worker thread, when no frame was written in it for
+    RACY_NS. The header stores the folder modification time seen before
+    that listing and the manifest is only trusted while the folder still
+    has that exact time. The listing waits RACY_NS after the last change of
+    the folder, so a file added in the same timestamp tick can't be missed.
 
-    def formatted_version(self):
-        return self.format_version(self.__version)
+    The manifest lives in a sub folder, created before the folder time is
+    read, so it is replaced atomically without changing the version folder
+    time. Every writer of a folder holds the same lock. Reading the cache
+    info never writes a manifest unless asked with update().
 
-    def frame_padding(self):
-        return self.__frame_padding
+    Each line is a json record, the first one is the header:
+        {"ovfx_manifest": 3, "proxy": false, "dir_mtime_ns": 1673708564000000000, "listed_ns": 1673708570000000000}
+        {"name": "name_v001.1001.bgeo.sc", "size": 1024, "mtime": 1673708564.0}
+    """
 
-    def element_name(self, node, add_prx=False):
-        parent = node
-        for i in range(node.parm('parentprefix').eval()):
-            parent = parent.parent()
+    DIR_NAME = '.ovfx'
+    FILE_NAME = 'manifest'
+    FORMAT_VERSION = 3
+    RACY_NS = 2000000000 # Coarsest modification time resolution of the supported file systems
+    MAX_ATTEMPTS = 5 # listings of a folder that keeps changing before giving up
 
-        name = node.name()
-        if add_prx: # Add the proxy suffixe
+    __locks = {} # {directory: threading.Lock}
+    __locks_lock = threading.Lock()
+    __tracked = {} # {rop session id: proxy}
+    __pending = {} # {directory: [proxy, time of the last record, attempts]} waiting to be listed
+    __pending_lock = threading.Lock()
+    __thread = None
+
+    def __init__(self, directory):
+
+        self.__directory = directory
+        self.__path = os.path.join(directory or '.', self.DIR_NAME, self.FILE_NAME)
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} object from {} at {}>'.format(cl.__module__, cl.__name__, self.__directory, hex(id(self)))
+        return result
+
+    def path(self):
+        return self.__path
+
+    def directory(self):
+        return self.__directory
+
+    @classmethod
+    def lock(cls, directory):
+        """Return the lock held by every writer of the manifest of a directory"""
+        key = os.path.normcase(os.path.abspath(directory or '.'))
+        with cls.__locks_lock:
+            if key not in cls.__locks:
+                cls.__locks[key] = threading.Lock()
+            return cls.__locks[key]
+
+    @classmethod
+    def stamp(cls, directory):
+        """
+        Return the state of a directory as {'dir_mtime_ns': int, 'listed_ns': int},
+        or None if it doesn't exist. Call it before listing the directory.
+        """
+        try:
+            mtime_ns = os.stat(directory or '.').st_mtime_ns
+        except OSError:
+            return None
+        return {'dir_mtime_ns': mtime_ns, 'listed_ns': time.time_ns()}
+
+    @classmethod
+    def trusted(cls, header):
+        """Whether the listing of a manifest header started late enough after the folder changed"""
+        try:
+            mtime_ns, listed_ns = header['dir_mtime_ns'], header['listed_ns']
+        except (KeyError, TypeError):
+            return False
+        return listed_ns - mtime_ns >= cls.RACY_NS
+
+    @classmethod
+    def list_directory(cls, directory):
+        """Return {name: (size, mtime)} of the files of a directory, without the manifest folder"""
+        files = {}
+        try:
+            iterator = os.scandir(directory or '.')
+        except OSError: # the directory doesn't exist
+            return files
+        with iterator:
+            for entry in iterator:
+                if entry.name == cls.DIR_NAME:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError: # deleted while listing
+                    continue
+                files[entry.name] = (stat.st_size, stat.st_mtime)
+        return files
+
+    def __header(self, records):
+        if records and records[0].get('ovfx_manifest') == self.FORMAT_VERSION:
+            return records[0]
+        return None
+
+    def fresh(self, records=None):
+        """Whether the folder didn't change since it was listed for the manifest"""
+        if records is None:
+            records = self.__records()
+        header = self.__header(records)
+        if header is None or not self.trusted(header):
+            return False
+        try:
+            return os.stat(self.__directory or '.').st_mtime_ns == header['dir_mtime_ns']
+        except OSError: # The folder is gone
+            return False
+
+    def __records(self):
+        try:
+            with open(self.__path) as f:
+                lines = f.readlines()
+        except (IOError, OSError):
+            return None
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError: # Written by an older version
+                return None
+        return records
+
+    def proxy(self):
+        """Whether the folder holds proxy geometry, None if unknown"""
+        header = self.__header(self.__records())
+        if header is not None:
+            return header.get('proxy')
+        return None
+
+    def files(self):
+        """Return {name: (size, mtime)} of every file of the folder, or None if the manifest is missing or stale"""
+        records = self.__records()
+        if not self.fresh(records):
+            return None
+        return dict((record['name'], (record['size'], record['mtime'])) for record in records[1:])
+
+    def update(self, proxy=None):
+        """
+        List the folder and write the manifest.
+
+        Returns:
+            False when the folder changed less than RACY_NS ago, the
+            manifest is not written and update() must be called again later.
+        """
+        folder = os.path.dirname(self.__path)
+        with self.lock(self.__directory):
+            try:
+                if not os.path.isdir(folder): # Changes the folder time, so before the stamp
+                    os.mkdir(folder)
+            except OSError: # Read only location or the folder is gone
+                return True
+            stamp = self.stamp(self.__directory)
+            if stamp is None:
+                return True
+            if not self.trusted(stamp):
+                return False
+            files = self.list_directory(self.__directory)
+            if proxy is None:
+                proxy = bool(self.proxy())
+            lines = [json.dumps(dict(stamp, ovfx_manifest=self.FORMAT_VERSION, proxy=proxy))]
+            for name, (size, mtime) in sorted(files.items()):
+                lines.append(json.dumps({'name': name, 'size': size, 'mtime': mtime}))
+            self.__write(lines)
+        return True
+
+    def __write(self, lines):
+        folder = os.path.dirname(self.__path)
+        try:
+            handle, temp_path = tempfile.mkstemp(prefix=self.FILE_NAME + '.', dir=folder)
+            try:
+                with os.fdopen(handle, 'w') as f:
+                    f.write(''.join(line + '\n' for line in lines))
+                os.replace(temp_path, self.__path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except (IOError, OSError): # Read only location
+            pass
+
+    @classmethod
+    def record(cls, path, proxy=False):
+        """
+        Record a file that was just written. Its folder manifest is written
+        by a worker thread once nothing was written in it for RACY_NS. The
+        roputil.scanner forgets the folder, as a frame rewritten in place
+        doesn't change the folder time.
+        """
+        directory = os.path.dirname(path)
+        scanner.invalidate(directory)
+        with cls.__pending_lock:
+            cls.__pending[directory] = [proxy, time.time_ns(), 0]
+            if cls.__thread is None:
+                cls.__thread = threading.Thread(target=cls.__run, name='ovfx-cache-manifest')
+                cls.__thread.daemon = True
+                cls.__thread.start()
+
+    @classmethod
+    def __run(cls):
+        try:
+            while True:
+                with cls.__pending_lock:
+                    if not cls.__pending:
+                        return
+                    now = time.time_ns()
+                    due = [(directory, entry) for directory, entry in cls.__pending.items() if now - entry[1] >= cls.RACY_NS]
+                for directory, entry in due:
+                    cls.__update_pending(directory, entry)
+                time.sleep(cls.RACY_NS / 4e9)
+        finally:
+            with cls.__pending_lock:
+                cls.__thread = None
+
+    @classmethod
+    def __update_pending(cls, directory, entry):
+        """Write the manifest of a pending folder, try again later while it keeps changing"""
+        try:
+            done = cls(directory).update(proxy=entry[0])
+        except Exception: # Never stop the worker thread
+            done = True
+        with cls.__pending_lock:
+            if cls.__pending.get(directory) is not entry: # Recorded again in the meantime
+                return
+            entry[2] += 1
+            if done or entry[2] >= cls.MAX_ATTEMPTS:
+                del cls.__pending[directory]
+            else:
+                entry[1] = time.time_ns()
+
+    @classmethod
+    def flush_pending(cls):
+        """Write the manifests still pending, waiting until their folders are old enough. Called at exit."""
+        while True:
+            with cls.__pending_lock:
+                if not cls.__pending:
+                    return
+                items = list(cls.__pending.items())
+            wait = max(cls.RACY_NS - (time.time_ns() - min(entry[1] for directory, entry in items)), 0)
+            time.sleep(wait / 1e9)
+            for directory, entry in items:
+                cls.__update_pending(directory, entry)
+
+    @classmethod
+    def remove_directory(cls, directory):
+        """
+        Remove a directory if nothing but the manifest is left in it.
+        Raise OSError if other files are in it.
+        """
+        names = os.listdir(directory or '.')
+        if not set(names) <= set([cls.DIR_NAME]):
+            raise OSError('{} is not empty'.format(directory))
+        with cls.lock(directory):
+            if names:
+                shutil.rmtree(os.path.join(directory, cls.DIR_NAME))
+            os.rmdir(directory)
+
+    @classmethod
+    def track_render(cls, rop_node, proxy=False):
+        """
+        Record the files written by a geometry ROP in the manifests while it
+        renders. This applies to renders from the current session only,
+        background renders are picked up by the folder scan.
+        """
+        if rop_node.sessionId() not in cls.__tracked:
+            rop_node.addRenderEventCallback(cls.render_event)
+        cls.__tracked[rop_node.sessionId()] = proxy
+
+    @classmethod
+    def render_event(cls, rop_node, event_type, time):
+        """hou.RopNode render event callback added by track_render()"""
+        if event_type == getattr(hou.ropRenderEventType, 'PostWrite', hou.ropRenderEventType.PostFrame):
+            cls.record(rop_node.parm('sopoutput').evalAtTime(time), proxy=cls.__tracked.get(rop_node.sessionId(), False))
+
+atexit.register(CacheManifest.flush_pending)
+
+
+class SeqSnapshot(object):
+    """
+    Frames, sizes and modification times of the files of a sequence, read
+    from the folder roputil.CacheManifest or with a single os.scandir pass
+    on the sequence directory when the manifest is missing or stale.
+
+    The values are stored in arrays sorted by frame so the frame range,
+    count, total size and date range are computed without touching the
+    file system again. A path without a frame number is treated as a single
+    static file.
+    """
+
+    FRAME_RE = re.compile(r'^(?P<head>.*?)\.(?P<frame>-?\d+(?:\.\d+)?)(?P<tail>\.[^\d.][^/]*)$')
+    NUMBER_RE = re.compile(r'-?\d+(?:\.\d+)?') # The frame part of FRAME_RE
+
+    def __init__(self, path, use_manifest=True, update_manifest=False, files=None, from_manifest=False):
+        """
+        Args:
+            path (str)               : A file path of the sequence.
+            use_manifest (bool)      : Read the files from the folder manifest when it is fresh.
+            update_manifest (bool)   : Write the manifest when it is stale, off by default so
+                                       reading the cache info never writes in the cache folders.
+            files (dict)             : {name: (size, mtime)} of the directory already listed, e.g. by
+                                       roputil.scanner. The directory is not read again.
+            from_manifest (bool)     : Whether the given files were read from the folder manifest.
+        """
+        self.__path = path
+        self.__directory, self.__head, self.__tail = self.split(path)
+        self.__names = []
+        self.__frames = array.array('d')
+        self.__sizes = array.array('q')
+        self.__mtimes = array.array('d')
+        self.__from_manifest = from_manifest if files is not None else False
+        self.__scan(use_manifest, update_manifest, files)
+
+    @classmethod
+    def split(cls, path):
+        """Return the (directory, head, tail) of a sequence path. The tail is None for a static file."""
+        directory, basename = os.path.split(path)
+        match = cls.FRAME_RE.match(basename)
+        if match:
+            return directory, match.group('head'), match.group('tail')
+        return directory, basename, None
+
+    @classmethod
+    def pattern(cls, path):
+        """Return the file name of a sequence path with the frame replaced by *"""
+        directory, head, tail = cls.split(path)
+        if tail is None:
+            return head
+        return '{}.*{}'.format(head, tail)
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} object from {} at {}>'.format(cl.__module__, cl.__name__, self.__path, hex(id(self)))
+        return result
+
+    def __scan(self, use_manifest, update_manifest, files):
+        if self.__tail is None and files is None: # A single file, no need to list the directory
+            try:
+                stat = os.stat(self.__path)
+            except OSError:
+                return
+            self.__names.append(self.__head)
+            self.__frames.append(0)
+            self.__sizes.append(stat.st_size)
+            self.__mtimes.append(stat.st_mtime)
+            return
+
+        if files is None and use_manifest:
+            manifest = CacheManifest(self.__directory)
+            folder_files = manifest.files()
+            if folder_files is not None:
+                files = dict((name, value) for name, value in folder_files.items() if self.frame(name) is not None)
+                self.__from_manifest = True
+            elif update_manifest: # So the next reads don't have to list the folder
+                manifest.update()
+        if files is None:
+            files = self.__list()
+
+        entries = []
+        for name, (size, mtime) in files.items():
+            frame = self.frame(name)
+            if frame is not None:
+                entries.append((frame, name, size, mtime))
+        entries.sort()
+        for frame, name, size, mtime in entries:
+            self.__names.append(name)
+            self.__frames.append(frame)
+            self.__sizes.append(size)
+            self.__mtimes.append(mtime)
+
+    def __list(self):
+        """Return {name: (size, mtime)} of the sequence files found in the directory"""
+        files = {}
+        try:
+            iterator = os.scandir(self.__directory or '.')
+        except OSError: # the directory doesn't exist
+            return files
+        with iterator:
+            for entry in iterator:
+                name = entry.name
+                if self.frame(name) is None:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError: # deleted while listing
+                    continue
+                files[name] = (stat.st_size, stat.st_mtime)
+        return files
+
+    def frame(self, name):
+        """Return the frame number of a file name of this sequence or None if it doesn't match"""
+        if self.__tail is None:
+            return 0 if name == self.__head else None
+        if not name.startswith(self.__head + '.') or not name.endswith(self.__tail):
+            return None
+        number = name[len(self.__head) + 1:len(name) - len(self.__tail)]
+        if not self.NUMBER_RE.fullmatch(number): # float() also takes inf, nan, 1e5 or 1_000
+            return None
+        return float(number)
+
+    def from_manifest(self):
+        """Whether the files were read from the folder manifest rather than listed"""
+        return self.__from_manifest
+
+    def files_info(self):
+        """Return the files as {name: (size, mtime)}"""
+        return dict(zip(self.__names, zip(self.__sizes, self.__mtimes)))
+
+    def path(self, format=None):
+        """Return the sequence path. When format is given, e.g. '*', it replaces the frame number."""
+        if format is None or self.__tail is None:
+            return self.__path
+        return os.path.join(self.__directory, '{}.{}{}'.format(self.__head, format, self.__tail))
+
+    def directory(self):
+        return self.__directory
+
+    def is_seq(self):
+        return self.__tail is not None
+
+    def count(self):
+        return len(self.__names)
+
+    def names(self):
+        return self.__names
+
+    def files(self):
+        return [os.path.join(self.__directory, name) for name in self.__names]
+
+    def frames(self):
+        return self.__frames
+
+    def sizes(self):
+        return self.__sizes
+
+    def mtimes(self):
+        return self.__mtimes
+
+    def first_frame(self):
+        return format_frame(self.__frames[0])
+
+    def last_frame(self):
+        return format_frame(self.__frames[-1])
+
+    def size(self):
+        """Total size in bytes"""
+        return sum(self.__sizes)
+
+    def first_mtime(self):
+        """Modification time of the first frame"""
+        return self.__mtimes[0]
+
+    def last_mtime(self):
+        """Modification time of the last frame"""
+        return self.__mtimes[-1]
+
+    def time_diff(self):
+        """Seconds between the first and last frame modification times"""
+        return self.__mtimes[-1] - self.__mtimes[0]
+
+def format_frame(frame):
+    """Return the frame as an int when it has no decimal, e.g. 1001 or 1001.5"""
+    if frame == int(frame):
+        return int(frame)
+    return frame
+
+def format_size(size):
+    """Return a human readable size, e.g. 1.25 GB"""
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if size < 1024 or unit == 'TB':
+            break
+        size /= 1024.0
+    if unit == 'B':
+        return '{} {}'.format(int(size), unit)
+    return '{:.2f} {}'.format(size, unit)
+
+
+class SeqIntegrity(object):
+    """
+    Integrity of a sequence against the frames rendered by its node:
+    missing, duplicate, zero byte, abnormally small and out of range frames.
+
+    The frames, rounded to 2 decimals like roputil.FrameTable, and the
+    sizes of a roputil.SeqSnapshot are loaded in NumPy arrays so a sequence
+    of tens of thousands of frames is checked without a Python loop.
+    """
+    SMALL_RATIO = 0.1 # Files smaller than this ratio of the median size are reported
+
+    def __init__(self, snapshot, frames, small_ratio=SMALL_RATIO):
+        """
+        Args:
+            snapshot (SeqSnapshot)   : The files found on disk.
+            frames (list)            : The frames rendered by the node, see roputil.Node.rendered_frames().
+            small_ratio (float)      : Ratio of the median size under which a file is reported.
+        """
+        if numpy is None:
+            raise ImportError('The sequence integrity requires NumPy')
+        found = numpy.rint(numpy.asarray(snapshot.frames(), dtype=numpy.float64) * 100).astype(numpy.int64)
+        sizes = numpy.asarray(snapshot.sizes(), dtype=numpy.int64)
+        expected = numpy.unique(numpy.rint(numpy.asarray(frames, dtype=numpy.float64) * 100).astype(numpy.int64))
+        self.__step = float(numpy.diff(expected).min()) if len(expected) > 1 else 100.0 # In centi frames
+
+        unique, counts = numpy.unique(found, return_counts=True)
+        self.__expected = len(expected)
+        self.__found = len(unique)
+        self.__missing = numpy.setdiff1d(expected, unique, assume_unique=True)
+        self.__outside = numpy.setdiff1d(unique, expected, assume_unique=True)
+        self.__duplicates = unique[counts > 1]
+        self.__median = float(numpy.median(sizes)) if len(sizes) else 0.0
+        self.__zero = numpy.unique(found[sizes == 0])
+        self.__small = numpy.unique(found[(sizes > 0) & (sizes < self.__median * small_ratio)])
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} missing={} duplicates={} zero={} small={}>'.format(cl.__module__, cl.__name__, len(self.__missing), len(self.__duplicates), len(self.__zero), len(self.__small))
+        return result
+
+    @staticmethod
+    def __frame_list(centi_frames):
+        return [format_frame(frame / 100.0) for frame in centi_frames.tolist()]
+
+    def __ranges(self, centi_frames):
+        """Return the frames as ranges of consecutive frames, e.g. '1001-1005, 1200'"""
+        if not len(centi_frames):
+            return ''
+        breaks = numpy.flatnonzero(numpy.diff(centi_frames) > self.__step + 1) + 1 # 1 centi frame of rounding
+        starts = numpy.concatenate(([0], breaks))
+        ends = numpy.concatenate((breaks - 1, [len(centi_frames) - 1]))
+        items = []
+        for first, last in zip(self.__frame_list(centi_frames[starts]), self.__frame_list(centi_frames[ends])):
+            items.append(str(first) if first == last else '{}-{}'.format(first, last))
+        return ', '.join(items)
+
+    def missing(self):
+        """Return the frames of the range not found on disk"""
+        return self.__frame_list(self.__missing)
+
+    def duplicates(self):
+        """Return the frames found more than once, e.g. with two paddings"""
+        return self.__frame_list(self.__duplicates)
+
+    def zero(self):
+        """Return the frames of the zero byte files"""
+        return self.__frame_list(self.__zero)
+
+    def small(self):
+        """Return the frames of the files abnormally small compared to the median size"""
+        return self.__frame_list(self.__small)
+
+    def outside(self):
+        """Return the frames found on disk outside of the range or between its steps"""
+        return self.__frame_list(self.__outside)
+
+    def median_size(self):
+        return self.__median
+
+    def ok(self):
+        return not (len(self.__missing) or len(self.__duplicates) or len(self.__zero) or len(self.__small))
+
+    def __lines(self, limit):
+        def line(label, centi_frames):
+            text = self.__ranges(centi_frames)
+            if limit and len(text) > limit:
+                text = text[:text.rfind(', ', 0, limit)] + ', ...'
+            return '\n{}: {} ({})'.format(label, len(centi_frames), text)
+
+        if self.ok():
+            info = '\nIntegrity    : OK ({} frames)'.format(self.__expected)
+        else:
+            info = '\nIntegrity    : {} of {} frames found'.format(self.__found - len(self.__outside), self.__expected)
+        for label, centi_frames in (('Missing      ', self.__missing),
+                                    ('Duplicates   ', self.__duplicates),
+                                    ('Zero Byte    ', self.__zero),
+                                    ('Small        ', self.__small),
+                                    ('Out Of Range ', self.__outside)):
+            if len(centi_frames):
+                info += line(label, centi_frames)
+        return info
+
+    def summary(self, limit=60):
+        """Return the lines added to the cache info, the frame lists are cut to limit characters"""
+        return self.__lines(limit)
+
+    def report(self):
+        """Return the full report with every frame"""
+        info = self.__lines(None).lstrip('\n')
+        if len(self.__small):
+            info += '\nMedian Size  : {}'.format(format_size(self.__median))
+        return info
+
+
+class CacheScanner(object):
+    """
+    Read the sequence snapshots used for the cache information in background
+    threads.
+
+    Scanning a sequence on a network storage can take seconds so it is done
+    in a thread pool when the UI is available. The files are cached by
+    directory and validated with the directory modification time, so a
+    directory that didn't change is never listed twice, whatever the number
+    of sequences read from it. Every node reading the same files shares the
+    same snapshot. The MAX_CACHE least recently used directories are kept,
+    and a directory whose frames are rewritten in place, which doesn't
+    change its time, is dropped with invalidate().
+
+    By convention a single instance of this object exists: roputil.scanner
+    """
+
+    MAX_CACHE = 256
+
+    def __init__(self, max_workers=4):
+
+        self.__max_workers = max_workers
+        self.__executor = None
+        self.__lock = threading.Lock()
+        self.__cache = collections.OrderedDict() # {directory: {'mtime', 'files', 'from_manifest', 'snapshots': {path: roputil.SeqSnapshot}}}, least recently used first
+        self.__pending = {} # {path: [callbacks]}
+        self.__parm_requests = {} # {(node session id, parm name): (path, show_size)}
+        self.__enabled = True
+
+    @staticmethod
+    def directory_mtime(path):
+        """Return the modification time of the path directory or None if it doesn't exist"""
+        try:
+            return os.stat(os.path.dirname(path) or '.').st_mtime
+        except OSError:
+            return None
+
+    def clear(self):
+        with self.__lock:
+            self.__cache.clear()
+
+    def invalidate(self, directory):
+        """Forget the files of a directory, e.g. when a render rewrites frames in place"""
+        with self.__lock:
+            self.__cache.pop(directory, None)
+
+    def set_enabled(self, enabled):
+        """Turn off the parm updates, e.g. in the processes of a parallel render"""
+        self.__enabled = enabled
+
+    def enabled(self):
+        return self.__enabled
+
+    def cached_snapshot(self, path):
+        """Return the cached snapshot if the directory didn't change since it was listed, None otherwise"""
+        directory = os.path.dirname(path)
+        mtime = self.directory_mtime(path)
+        with self.__lock:
+            entry = self.__cache.get(directory)
+            if entry is None or entry['mtime'] != mtime:
+                return None
+            self.__cache.move_to_end(directory)
+            snapshot = entry['snapshots'].get(path)
+        if snapshot is None: # Another sequence of the directory, filtered from the listing
+            snapshot = SeqSnapshot(path, files=entry['files'], from_manifest=entry['from_manifest'])
+            with self.__lock:
+                entry['snapshots'][path] = snapshot
+        return snapshot
+
+    def snapshot(self, path, force=False):
+        """Return the roputil.SeqSnapshot of the path synchronously, using the cache if possible"""
+        snapshot = None if force else self.cached_snapshot(path)
+        if snapshot is None:
+            snapshot = self.__scan(path)
+        return snapshot
+
+    def info(self, path, show_size=True, force=False, frames=None):
+        """Return the cache info synchronously, using the cache if possible"""
+        return Node.file_info(path, show_size, snapshot=self.snapshot(path, force=force), frames=frames)
+
+    def request(self, path, callback=None, force=False, update_manifest=False):
+        """
+        Return the snapshot right away if it is cached. Otherwise the scan
+        is submitted to the thread pool, callback(snapshot) is called from
+        the main thread once it is done and None is returned.
+
+        When there is no UI, the scan is done synchronously. With
+        update_manifest on, a stale folder manifest is written again.
+        """
+        snapshot = None if force else self.cached_snapshot(path)
+        if snapshot is not None or not hou.isUIAvailable():
+            if snapshot is None:
+                snapshot = self.__scan(path, update_manifest)
+            if callback:
+                callback(snapshot)
+            return snapshot
+
+        with self.__lock:
+            if path in self.__pending: # Already being scanned for another node
+                if callback:
+                    self.__pending[path].append(callback)
+                return None
+            self.__pending[path] = [callback] if callback else []
+            if self.__executor is None:
+                self.__executor = futures.ThreadPoolExecutor(max_workers=self.__max_workers)
+        self.__executor.submit(self.__scan_pending, path, update_manifest)
+        return None
+
+    def update_parm(self, parm, path, show_size=True, force=False, frames=None):
+        """
+        Set the cache info of the path on a string parm. The parm shows a
+        scanning message until the background scan is done. Only the result
+        of the last request made for a parm is applied.
+
+        The integrity of the sequence is added when the frames of the node
+        are given, see roputil.Node.file_info().
+        """
+        if not self.__enabled:
+            return
+        parm_key = (parm.node().sessionId(), parm.name())
+        request = (path, bool(show_size), frames)
+        self.__parm_requests[parm_key] = request
+
+        def set_info(snapshot):
+            if self.__parm_requests.get(parm_key) != request: # A newer request was made for this parm
+                return
+            del self.__parm_requests[parm_key]
+            node = hou.nodeBySessionId(parm_key[0])
+            if node is None: # The node was deleted during the scan
+                return
+            if isinstance(snapshot, Exception):
+                info = 'Cannot scan the files: {}'.format(snapshot)
+            else:
+                info = Node.file_info(path, show_size, snapshot=snapshot, frames=frames)
+            parm = node.parm(parm_key[1])
+            if info != parm.eval():
+                parm.set(info)
+
+        if self.request(path, set_info, force=force) is None:
+            if parm.eval() != SCANNING_INFO:
+                parm.set(SCANNING_INFO)
+
+    @profiled('CacheScanner.scan')
+    def __scan(self, path, update_manifest=False):
+        directory = os.path.dirname(path)
+        mtime = self.directory_mtime(path)
+        manifest = CacheManifest(directory)
+        files = manifest.files()
+        from_manifest = files is not None
+        if files is None and update_manifest and manifest.update(): # So the next reads don't have to list the folder
+            files = manifest.files()
+        if files is None:
+            files = CacheManifest.list_directory(directory)
+        snapshot = SeqSnapshot(path, files=files, from_manifest=from_manifest)
+        with self.__lock:
+            self.__cache[directory] = {'mtime': mtime, 'files': files, 'from_manifest': from_manifest, 'snapshots': {path: snapshot}}
+            self.__cache.move_to_end(directory)
+            while len(self.__cache) > self.MAX_CACHE:
+                self.__cache.popitem(last=False)
+        return snapshot
+
+    def __scan_pending(self, path, update_manifest=False):
+        try:
+            snapshot = self.__scan(path, update_manifest)
+        except Exception as e:
+            snapshot = e
+        with self.__lock:
+            callbacks = self.__pending.pop(path, [])
+        for callback in callbacks:
+            execute_deferred(callback, snapshot)
+
+scanner = CacheScanner()
+
+
+class DeleteTask(object):
+    """
+    A sequence deletion running in roputil.deleter. The counters are updated
+    by the worker threads and can be read from the main thread at any time.
+    """
+
+    def __init__(self, path, files, directory):
+
+        self.__path = path
+        self.__files = files
+        self.__directory = directory
+        self.__lock = threading.Lock()
+        self.__deleted = 0
+        self.__errors = [] # [(file path, error message)]
+        self.__cancelled = False
+        self.__done = False
+        self.__removed_directory = False
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} {} deleted={}/{}>'.format(cl.__module__, cl.__name__, self.__path, self.__deleted, len(self.__files))
+        return result
+
+    def path(self):
+        return self.__path
+
+    def files(self):
+        return self.__files
+
+    def directory(self):
+        return self.__directory
+
+    def total(self):
+        return len(self.__files)
+
+    def deleted(self):
+        return self.__deleted
+
+    def errors(self):
+        return self.__errors
+
+    def progress(self):
+        """Return the ratio of processed files between 0 and 1"""
+        if not self.__files:
+            return 1.0
+        return float(self.__deleted + len(self.__errors)) / len(self.__files)
+
+    def cancel(self):
+        """Stop the deletion after the files currently being deleted"""
+        self.__cancelled = True
+
+    def cancelled(self):
+        return self.__cancelled
+
+    def done(self):
+        return self.__done
+
+    def removed_directory(self):
+        """Whether the version directory was removed because it was empty"""
+        return self.__removed_directory
+
+    def delete_batch(self, files):
+        """Unlink a batch of files. Called from a worker thread."""
+        for file_path in files:
+            if self.__cancelled:
+                break
+            try:
+                os.unlink(file_path)
+            except FileNotFoundError: # Already gone, nothing to do
+                pass
+            except OSError as e:
+                with self.__lock:
+                    self.__errors.append((file_path, str(e)))
+                continue
+            with self.__lock:
+                self.__deleted += 1
+
+    def finish(self):
+        """Remove the version directory if nothing but the cache manifest is left. Called from a worker thread."""
+        try:
+            CacheManifest.remove_directory(self.__directory)
+            self.__removed_directory = True
+        except OSError: # Another process is writing in the directory or it is already gone
+            pass
+        self.__done = True
+
+
+class CacheDeleter(object):
+    """
+    Delete the files of a sequence in batches from a thread pool.
+
+    Removing thousands of files on a network storage can block Houdini for
+    minutes so the files are unlinked by worker threads. The progress and
+    finished callbacks receive the roputil.DeleteTask and are called from
+    the main thread, so they can update the UI. When there is no UI, the
+    deletion is done synchronously.
+
+    By convention a single instance of this object exists: roputil.deleter
+    """
+
+    def __init__(self, max_workers=8, batch_size=256):
+
+        self.__max_workers = max_workers
+        self.__batch_size = batch_size
+        self.__executor = None
+        self.__lock = threading.Lock()
+        self.__tasks = {} # {path: roputil.DeleteTask}
+
+    def task(self, path):
+        """Return the deletion running for a path or None"""
+        with self.__lock:
+            return self.__tasks.get(path)
+
+    def tasks(self):
+        with self.__lock:
+            return list(self.__tasks.values())
+
+    def delete(self, snapshot, progress=None, finished=None):
+        """
+        Delete the files of a sequence snapshot.
+
+        The version directory is removed at the end if it is empty and the
+        finished callback is called once, after every batch is done.
+
+        Args:
+            snapshot (roputil.SeqSnapshot)  : The files to delete.
+            progress (function)             : progress(task) called after each batch.
+            finished (function)             : finished(task) called once the deletion is over.
+
+        Returns:
+            The roputil.DeleteTask, or the one already running for that path
+        """
+        path = snapshot.path()
+        files = snapshot.files()
+        batches = [files[i:i + self.__batch_size] for i in range(0, len(files), self.__batch_size)]
+        with self.__lock:
+            if path in self.__tasks: # Already being deleted
+                return self.__tasks[path]
+            task = self.__tasks[path] = DeleteTask(path, files, snapshot.directory())
+
+        if not hou.isUIAvailable():
+            for batch in batches:
+                task.delete_batch(batch)
+                if progress:
+                    progress(task)
+            self.__finish(task, finished)
+            return task
+
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = futures.ThreadPoolExecutor(max_workers=self.__max_workers)
+        remaining = [len(batches)]
+        def run_batch(batch):
+            task.delete_batch(batch)
+            if progress:
+                execute_deferred(progress, task)
+            with self.__lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last: # The last batch to finish cleans up the directory
+                self.__finish(task, finished)
+
+        if not batches:
+            self.__executor.submit(self.__finish, task, finished)
+        for batch in batches:
+            self.__executor.submit(run_batch, batch)
+        return task
+
+    def __finish(self, task, finished):
+        task.finish()
+        with self.__lock:
+            self.__tasks.pop(task.path(), None)
+        if finished:
+            execute_deferred(finished, task)
+
+deleter = CacheDeleter()
+
+
+class TransferTask(object):
+    """
+    The frames of a staged render being copied from the local scratch
+    folder to the output location by roputil.stager. The counters are
+    updated by the worker threads and can be read from the main thread at
+    any time.
+    """
+
+    PARTIAL_SUFFIX = '.ovfx_partial'
+
+    def __init__(self, node_path, progress=None, finished=None):
+
+        self.__node_path = node_path
+        self.__progress = progress
+        self.__finished = finished
+        self.__lock = threading.Lock()
+        self.__files = [] # [(local path, remote path)]
+        self.__copied = [] # [(local path, remote path)]
+        self.__bytes = 0
+        self.__partial = set() # remote paths being copied
+        self.__errors = [] # [(file path, error message)]
+        self.__renders = 0 # renders in progress
+        self.__done = False
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} {} copied={}/{}>'.format(cl.__module__, cl.__name__, self.__node_path, len(self.__copied), len(self.__files))
+        return result
+
+    def node_path(self):
+        return self.__node_path
+
+    def progress_callback(self):
+        return self.__progress
+
+    def finished_callback(self):
+        return self.__finished
+
+    def total(self):
+        return len(self.__files)
+
+    def copied(self):
+        return len(self.__copied)
+
+    def copied_bytes(self):
+        return self.__bytes
+
+    def partial(self):
+        """Return the output paths being copied right now"""
+        with self.__lock:
+            return sorted(self.__partial)
+
+    def errors(self):
+        return self.__errors
+
+    def pending(self):
+        """Number of frames written locally that are not copied yet"""
+        return len(self.__files) - len(self.__copied) - len(self.__errors)
+
+    def progress(self):
+        """Return the ratio of processed files between 0 and 1"""
+        if not self.__files:
+            return 1.0
+        return float(len(self.__copied) + len(self.__errors)) / len(self.__files)
+
+    def rendering(self):
+        return self.__renders > 0
+
+    def done(self):
+        return self.__done
+
+    def begin_render(self):
+        with self.__lock:
+            self.__renders += 1
+
+    def end_render(self):
+        with self.__lock:
+            self.__renders = max(self.__renders - 1, 0)
+
+    def add(self, local, remote):
+        with self.__lock:
+            self.__files.append((local, remote))
+
+    def copy(self, local, remote):
+        """
+        Copy a frame under a temporary name next to its final path then
+        rename it, so a partial copy is never read as a frame. Called from
+        a worker thread.
+
+        Returns:
+            True if the frame was copied
+        """
+        partial = remote + self.PARTIAL_SUFFIX
+        with self.__lock:
+            self.__partial.add(remote)
+        try:
+            directory = os.path.dirname(remote)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory, exist_ok=True)
+            shutil.copyfile(local, partial)
+            os.replace(partial, remote)
+            size = os.path.getsize(remote)
+        except (IOError, OSError) as e:
+            try:
+                os.unlink(partial)
+            except OSError: # Not created
+                pass
+            with self.__lock:
+                self.__errors.append((local, str(e)))
+            return False
+        finally:
+            with self.__lock:
+                self.__partial.discard(remote)
+        with self.__lock:
+            self.__copied.append((local, remote))
+            self.__bytes += size
+        return True
+
+    def finish(self):
+        """
+        Mark the task as done once nothing is rendering or waiting for a
+        copy, and remove the local copies.
+
+        Returns:
+            True the first time the task is done
+        """
+        with self.__lock:
+            if self.__done or self.__renders or len(self.__files) != len(self.__copied) + len(self.__errors):
+                return False
+            self.__done = True
+        directories = set()
+        for local, remote in self.__copied:
+            try:
+                os.unlink(local)
+            except OSError: # Already gone
+                pass
+            directories.add(os.path.dirname(local))
+        for directory in directories: # Remove the scratch folder if nothing but a manifest is left
+            try:
+                CacheManifest.remove_directory(directory)
+            except OSError: # Another render is writing in it
+                pass
+        return True
+
+
+class CacheStager(object):
+    """
+    Copy the frames of staged renders from a local scratch folder to the
+    output location with a thread pool.
+
+    When Stage On Local Scratch is checked on a geometry cache node, its
+    write ROPs render to the stgsopoutput path, which is the output path
+    template moved under the OVFX_ROP_SCRATCH_DIR folder. Each frame is
+    queued for copy as soon as it is written so the simulation keeps
+    cooking while the files go to the network. Until every frame is copied
+    the node read paths point to the local copies, see active().
+
+    The progress and finished callbacks receive the roputil.TransferTask
+    and are called from the main thread. When there is no UI, the frames
+    are copied synchronously.
+
+    By convention a single instance of this object exists: roputil.stager
+    """
+
+    SCRATCH_ENV = 'OVFX_ROP_SCRATCH_DIR'
+
+    def __init__(self, max_workers=4):
+
+        self.__max_workers = max_workers
+        self.__executor = None
+        self.__lock = threading.Lock()
+        self.__tasks = {} # {node session id: roputil.TransferTask}
+        self.__tracked = {} # {rop session id: (node session id, output parm name, proxy)}
+
+    @classmethod
+    def scratch_root(cls):
+        return os.environ.get(cls.SCRATCH_ENV) or os.path.join(tempfile.gettempdir(), 'ovfx-houdini-rop')
+
+    @classmethod
+    def local_template(cls, raw, root=None):
+        """
+        Return an output path template moved under the scratch folder. A
+        leading variable is expanded first and a drive letter becomes a
+        folder, e.g. C:/cache/geo.$F4.bgeo.sc gives
+        /tmp/ovfx-houdini-rop/C/cache/geo.$F4.bgeo.sc
+        """
+        root = (root or cls.scratch_root()).replace('\\', '/').rstrip('/')
+        match = re.match(r'^\$(\{\w+\}|\w+)', raw)
+        if match: # e.g. $JOB/cache/...
+            raw = hou.text.expandString(match.group()) + raw[match.end():]
+        return '{}/{}'.format(root, re.sub(r'^([A-Za-z]):', r'\1', raw).lstrip('/\\'))
+
+    def task(self, node):
+        """Return the transfer of a node or None"""
+        with self.__lock:
+            return self.__tasks.get(node.sessionId())
+
+    def tasks(self):
+        with self.__lock:
+            return list(self.__tasks.values())
+
+    def active(self, node):
+        """Whether frames of the node are still rendering or waiting in the scratch folder"""
+        task = self.task(node)
+        return task is not None and not task.done()
+
+    def track_render(self, node, rop_node, output_parm, proxy=False, progress=None, finished=None):
+        """
+        Queue the frames rendered by a write ROP of a node for transfer.
+
+        Args:
+            node (hou.Node)          : The geometry cache node.
+            rop_node (hou.RopNode)   : The ROP writing to the scratch folder.
+            output_parm (str)        : The parm of the node with the final output path, e.g. sopoutput.
+            proxy (bool)             : Whether the ROP writes the proxy geometry.
+            progress (function)      : progress(task) called after each copied frame.
+            finished (function)      : finished(task) called once every frame is copied.
+        """
+        with self.__lock:
+            task = self.__tasks.get(node.sessionId())
+            if task is None or task.done():
+                self.__tasks[node.sessionId()] = TransferTask(node.path(), progress, finished)
+            if rop_node.sessionId() not in self.__tracked:
+                rop_node.addRenderEventCallback(self.render_event)
+            self.__tracked[rop_node.sessionId()] = (node.sessionId(), output_parm, proxy)
+
+    def finish_render(self, node):
+        """
+        Called once the renders of a node returned. Finish its transfer if
+        nothing is left to copy, e.g. when the render failed before writing
+        a frame, so the node doesn't keep reading from the scratch folder.
+        """
+        task = self.task(node)
+        if task is not None and not task.done():
+            self.__finish(task)
+
+    def render_event(self, rop_node, event_type, time):
+        """hou.RopNode render event callback added by track_render()"""
+        node_session_id, output_parm, proxy = self.__tracked[rop_node.sessionId()]
+        node = hou.nodeBySessionId(node_session_id)
+        if node is None or not node.parm('staging').eval(): # Not staged anymore
+            return
+        with self.__lock:
+            task = self.__tasks.get(node_session_id)
+            if task is None or task.done(): # A new render after the last transfer finished
+                previous = task
+                task = self.__tasks[node_session_id] = TransferTask(node.path(),
+                                                                    previous.progress_callback() if previous else None,
+                                                                    previous.finished_callback() if previous else None)
+        if event_type == hou.ropRenderEventType.PreRender:
+            task.begin_render()
+        elif event_type == getattr(hou.ropRenderEventType, 'PostWrite', hou.ropRenderEventType.PostFrame):
+            local = rop_node.parm('sopoutput').evalAtTime(time)
+            remote = node.parm(output_parm).evalAtTime(time)
+            task.add(local, remote)
+            self.__submit(task, local, remote, proxy)
+        elif event_type == hou.ropRenderEventType.PostRender:
+            task.end_render()
+            self.__finish(task)
+
+    def __submit(self, task, local, remote, proxy):
+        if not hou.isUIAvailable():
+            self.__copy(task, local, remote, proxy)
+            return
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = futures.ThreadPoolExecutor(max_workers=self.__max_workers)
+        self.__executor.submit(self.__copy, task, local, remote, proxy)
+
+    def __copy(self, task, local, remote, proxy):
+        if task.copy(local, remote):
+            CacheManifest.record(remote, proxy=proxy)
+        if task.progress_callback():
+            execute_deferred(task.progress_callback(), task)
+        self.__finish(task)
+
+    def __finish(self, task):
+        if task.finish() and task.finished_callback():
+            execute_deferred(task.finished_callback(), task)
+
+stager = CacheStager()
+
+
+class FramePrefetcher(object):
+    """
+    Warm the next frames read by the nodes into the OS page cache while the
+    playbar moves, so playback doesn't wait on cold reads from the shared
+    storage.
+
+    On every playbar frame change, the read path of each enabled node is
+    taken from its cache mode (rpath or prxrpath) and the next frames in
+    the playback direction are found in its roputil.scanner snapshot. The
+    worker threads ask the system to read them ahead with posix_fadvise, or
+    touch their pages through mmap where it is not available. The frames
+    requested for a node are kept under its memory budget, the oldest are
+    forgotten first. A cache mode change stops the requests in progress and
+    a deleted node is dropped.
+
+    By convention a single instance of this object exists: roputil.prefetcher
+    """
+
+    def __init__(self, max_workers=2):
+
+        self.__max_workers = max_workers
+        self.__executor = None
+        self.__lock = threading.Lock()
+        self.__nodes = {} # {node session id: {'window', 'budget', 'path', 'frame', 'generation', 'warm': OrderedDict({file path: size})}}
+        self.__playbar_callback = False
+
+    def enable(self, node, window=10, budget=1024 * 1024 * 1024):
+        """
+        Prefetch the frames read by a node while the playbar moves.
+
+        Args:
+            node (hou.Node)      : The geometry cache node.
+            window (int)         : Number of frames read ahead.
+            budget (int)         : Maximum size in bytes of the frames requested ahead.
+        """
+        with self.__lock:
+            state = self.__nodes.setdefault(node.sessionId(), {'path': None, 'frame': None, 'generation': 0, 'warm': collections.OrderedDict()})
+            state['window'] = max(int(window), 0)
+            state['budget'] = max(int(budget), 0)
+        if not self.__playbar_callback and hou.isUIAvailable():
+            hou.playbar.addEventCallback(self.playbar_event)
+            self.__playbar_callback = True
+
+    def disable(self, node):
+        self.stop(node)
+        with self.__lock:
+            self.__nodes.pop(node.sessionId(), None)
+
+    def enabled(self, node):
+        return node.sessionId() in self.__nodes
+
+    def stop(self, node):
+        """Cancel the frames being requested for a node and forget the ones already warmed"""
+        with self.__lock:
+            state = self.__nodes.get(node.sessionId())
+            if state is not None:
+                state['generation'] += 1
+                state['path'] = None
+                state['frame'] = None
+                state['warm'].clear()
+
+    def warmed(self, node):
+        """Return the file paths requested for a node, the oldest first"""
+        with self.__lock:
+            state = self.__nodes.get(node.sessionId())
+            return list(state['warm']) if state else []
+
+    def playbar_event(self, event_type, frame):
+        """hou.playbar event callback added by enable()"""
+        if event_type != hou.playbarEvent.FrameChanged:
+            return
+        for session_id in list(self.__nodes):
+            node = hou.nodeBySessionId(session_id)
+            if node is None: # Deleted or from a previous scene
+                with self.__lock:
+                    self.__nodes.pop(session_id, None)
+            else:
+                self.prefetch(node, frame)
+
+    @staticmethod
+    def read_path(node):
+        """Return the evaluated read path of the node cache mode, None when bypassed"""
+        mode = node.parm('cachemode').eval()
+        if mode == 1:
+            return node.parm('rpath').eval()
+        if mode == 2:
+            return node.parm('prxrpath').eval()
+        return None
+
+    @staticmethod
+    def upcoming(frames, frame, window, backward=False):
+        """Return the indices of the window frames after a frame, or before it when playing backward"""
+        if backward:
+            end = bisect.bisect_left(frames, frame)
+            return list(range(end - 1, max(end - window, 0) - 1, -1))
+        start = bisect.bisect_right(frames, frame)
+        return list(range(start, min(start + window, len(frames))))
+
+    def prefetch(self, node, frame):
+        """
+        Request the frames following a frame of a node. The playback
+        direction is given by the previous frame.
+
+        Returns:
+            The list of file paths submitted to the worker threads
+        """
+        with self.__lock:
+            state = self.__nodes.get(node.sessionId())
+            if state is None:
+                return []
+            path = self.read_path(node)
+            if path != state['path']: # New version or cache mode
+                state['generation'] += 1
+                state['path'] = path
+                state['warm'].clear()
+            backward = state['frame'] is not None and frame < state['frame']
+            state['frame'] = frame
+        if not path or not state['window']:
+            return []
+        snapshot = scanner.cached_snapshot(path)
+        if snapshot is None: # Ready for the next frames
+            scanner.request(path)
+            return []
+        if not snapshot.is_seq():
+            return []
+
+        directory, names, sizes = snapshot.directory(), snapshot.names(), snapshot.sizes()
+        requested = []
+        with self.__lock:
+            warm = state['warm']
+            total = 0
+            for index in self.upcoming(snapshot.frames(), frame, state['window'], backward):
+                total += sizes[index]
+                if total > state['budget']:
+                    break
+                file_path = os.path.join(directory, names[index])
+                if file_path in warm:
+                    warm.move_to_end(file_path)
+                else:
+                    warm[file_path] = sizes[index]
+                    requested.append(file_path)
+            while warm and sum(warm.values()) > state['budget']: # Forget the oldest frames
+                warm.popitem(last=False)
+            generation = state['generation']
+        if requested:
+            if self.__executor is None:
+                self.__executor = futures.ThreadPoolExecutor(max_workers=self.__max_workers)
+            self.__executor.submit(self.__warm, node.sessionId(), generation, requested)
+        return requested
+
+    def __warm(self, session_id, generation, paths):
+        for file_path in paths:
+            state = self.__nodes.get(session_id)
+            if state is None or state['generation'] != generation: # Stopped or moved to another sequence
+                return
+            self.warm_file(file_path)
+
+    @staticmethod
+    def warm_file(path):
+        """Bring a file into the OS page cache without reading it in Python. Returns False if it can't be opened."""
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError: # Deleted in the meantime
+            return False
+        try:
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            else: # Touch one byte per page
+                size = os.fstat(fd).st_size
+                if size:
+                    mapped = mmap.mmap(fd, size, access=mmap.ACCESS_READ)
+                    try:
+                        for offset in range(0, size, mmap.PAGESIZE):
+                            mapped[offset]
+                    finally:
+                        mapped.close()
+        except (OSError, ValueError): # Not supported by the file system
+            return False
+        finally:
+            os.close(fd)
+        return True
+
+prefetcher = FramePrefetcher()
+
+
+class DirectoryWatcher(object):
+    """
+    Return the names of the files written in a directory since the last
+    call, new ones or rewritten ones whose modification time changed. Uses
+    inotify on Linux, through ctypes, and lists the directory otherwise.
+    The directory may not exist yet.
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    EVENT_HEADER = struct.Struct('iIII') # wd, mask, cookie, len
+
+    __libc = None
+
+    def __init__(self, directory, known=None):
+        """
+        Args:
+            directory (str)      : The directory to watch.
+            known (dict)         : {name: mtime} of the files already reported.
+        """
+        self.__directory = directory
+        self.__known = dict(known or {})
+        self.__fd = None
+        self.__started = False
+
+    @classmethod
+    def libc(cls):
+        """Return the C library if it has inotify, False otherwise"""
+        if cls.__libc is None:
+            cls.__libc = False
+            if sys.platform.startswith('linux'):
+                try:
+                    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+                    if hasattr(libc, 'inotify_init1'):
+                        cls.__libc = libc
+                except OSError:
+                    pass
+        return cls.__libc
+
+    def directory(self):
+        return self.__directory
+
+    def uses_inotify(self):
+        return self.__fd is not None
+
+    def __start(self):
+        """Set the inotify watch once the directory exists"""
+        if not os.path.isdir(self.__directory):
+            return False
+        libc = self.libc()
+        if libc:
+            fd = libc.inotify_init1(os.O_NONBLOCK | getattr(os, 'O_CLOEXEC', 0))
+            if fd >= 0:
+                if libc.inotify_add_watch(fd, self.__directory.encode(), self.IN_CLOSE_WRITE | self.IN_MOVED_TO) >= 0:
+                    self.__fd = fd
+                else: # e.g. no more watches available
+                    os.close(fd)
+        self.__started = True
+        return True
+
+    def new_names(self):
+        """Return the names of the files added or rewritten since the last call"""
+        if not self.__started:
+            if not self.__start():
+                return []
+            mtimes = self.__list() # Written before the watch was set
+        elif self.__fd is None: # Polling
+            mtimes = self.__list()
+        else:
+            mtimes = self.__stat(self.__read_events())
+        names = [name for name, mtime in mtimes.items() if self.__known.get(name) != mtime]
+        for name in names:
+            self.__known[name] = mtimes[name]
+        return names
+
+    def __list(self):
+        """Return {name: mtime} of the files of the directory"""
+        mtimes = {}
+        try:
+            iterator = os.scandir(self.__directory)
+        except OSError: # Removed
+            return mtimes
+        with iterator:
+            for entry in iterator:
+                try:
+                    mtimes[entry.name] = entry.stat().st_mtime
+                except OSError: # Removed while listing
+                    continue
+        return mtimes
+
+    def __stat(self, names):
+        """Return {name: mtime} of the files that still exist"""
+        mtimes = {}
+        for name in names:
+            try:
+                mtimes[name] = os.stat(os.path.join(self.__directory, name)).st_mtime
+            except OSError: # Removed right after
+                continue
+        return mtimes
+
+    def __read_events(self):
+        names = []
+        while True:
+            try:
+                data = os.read(self.__fd, 65536)
+            except BlockingIOError: # Nothing more to read
+                break
+            except OSError:
+                break
+            offset = 0
+            while offset + self.EVENT_HEADER.size <= len(data):
+                wd, mask, cookie, length = self.EVENT_HEADER.unpack_from(data, offset)
+                offset += self.EVENT_HEADER.size
+                name = data[offset:offset + length].split(b'\0', 1)[0]
+                offset += length
+                if name:
+                    names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        if self.__fd is not None:
+            os.close(self.__fd)
+            self.__fd = None
+
+
+class SeqTail(object):
+    """
+    Running totals of a sequence being written. The new frames are folded
+    in one by one so an update only costs the new files. It answers the
+    roputil.SeqSnapshot methods used by roputil.Node.file_info() and adds
+    the write throughput and the time left.
+
+    The progress only counts the frames written since the tail started, so
+    rewriting an existing version starts from zero.
+    """
+
+    RATE_WINDOW = 30.0 # seconds of samples used for the throughput
+
+    def __init__(self, snapshot, total_frames=None, since=None):
+        """
+        Args:
+            snapshot (roputil.SeqSnapshot)     : The files found when the tail started.
+            total_frames (int)                 : Number of frames to write.
+            since (float)                      : Time the render started, the files of the snapshot
+                                                 modified since then are counted as written.
+        """
+        self.__snapshot = snapshot
+        self.__total_frames = total_frames
+        self.__files = {} # {name: (frame, size, mtime)}
+        self.__size = 0
+        self.__ranges = None # (first frame, last frame, first mtime, last mtime), computed when read
+        self.__written = set() # names written since the tail started
+        self.__written_size = 0
+        for name, frame, size, mtime in zip(snapshot.names(), snapshot.frames(), snapshot.sizes(), snapshot.mtimes()):
+            self.__files[name] = (frame, size, mtime)
+            self.__size += size
+            if since is not None and mtime >= since:
+                self.__written.add(name)
+                self.__written_size += size
+        self.__samples = collections.deque() # [(time, written count, written size)]
+        self.__sample()
+
+    def __sample(self):
+        now = time.time()
+        self.__samples.append((now, len(self.__written), self.__written_size))
+        while len(self.__samples) > 2 and now - self.__samples[1][0] > self.RATE_WINDOW:
+            self.__samples.popleft()
+
+    def add(self, names):
+        """
+        Fold the names of the files written in the directory in the totals,
+        the names that are not frames of the sequence are ignored.
+
+        Returns:
+            The number of frames added or rewritten
+        """
+        added = 0
+        for name in names:
+            frame = self.__snapshot.frame(name)
+            if frame is None:
+                continue
+            try:
+                stat = os.stat(os.path.join(self.__snapshot.directory(), name))
+            except OSError: # Removed right after
+                continue
+            previous = self.__files.get(name)
+            if previous is not None:
+                self.__size -= previous[1]
+            self.__files[name] = (frame, stat.st_size, stat.st_mtime)
+            self.__size += stat.st_size
+            self.__written.add(name)
+            self.__written_size += stat.st_size
+            added += 1
+        if added:
+            self.__ranges = None
+            self.__sample()
+        return added
+
+    def __range(self, index):
+        if self.__ranges is None:
+            values = list(self.__files.values())
+            if values:
+                frames = [value[0] for value in values]
+                mtimes = [value[2] for value in values]
+                self.__ranges = (min(frames), max(frames), min(mtimes), max(mtimes))
+            else:
+                self.__ranges = (None, None, None, None)
+        return self.__ranges[index]
+
+    def path(self):
+        return self.__snapshot.path()
+
+    def is_seq(self):
+        return self.__snapshot.is_seq()
+
+    def count(self):
+        return len(self.__files)
+
+    def written(self):
+        """Number of frames written since the tail started"""
+        return len(self.__written)
+
+    def first_frame(self):
+        return format_frame(self.__range(0))
+
+    def last_frame(self):
+        return format_frame(self.__range(1))
+
+    def size(self):
+        return self.__size
+
+    def first_mtime(self):
+        return self.__range(2)
+
+    def last_mtime(self):
+        return self.__range(3)
+
+    def time_diff(self):
+        return self.last_mtime() - self.first_mtime()
+
+    def total_frames(self):
+        return self.__total_frames
+
+    def complete(self):
+        return self.__total_frames is not None and len(self.__written) >= self.__total_frames
+
+    def throughput(self):
+        """Return the (frames per second, bytes per second) written over the last RATE_WINDOW seconds"""
+        first, last = self.__samples[0], self.__samples[-1]
+        elapsed = time.time() - first[0] if last[1] != first[1] else 0
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return (last[1] - first[1]) / elapsed, (last[2] - first[2]) / elapsed
+
+    def eta(self):
+        """Seconds left to write the remaining frames, None if unknown"""
+        frames_per_second = self.throughput()[0]
+        if self.__total_frames is None or not frames_per_second:
+            return None
+        return max(self.__total_frames - len(self.__written), 0) / frames_per_second
+
+    def info(self):
+        """Return the throughput and time left lines of the cache info"""
+        frames_per_second, bytes_per_second = self.throughput()
+        info = '\nWriting      : {:.2f} frames/s, {}/s'.format(frames_per_second, format_size(bytes_per_second))
+        if self.__total_frames is not None:
+            info += '\nProgress     : {}/{}'.format(min(len(self.__written), self.__total_frames), self.__total_frames)
+        eta = self.eta()
+        if eta is not None:
+            info += '\nTime Left    : {}h {}m {}s'.format(int(eta / 3600), int(eta % 3600 / 60), int(round(eta % 60)))
+        return info
+
+
+class CacheTailer(object):
+    """
+    Keep the cache info of the nodes up to date while their files are
+    written by a background or parallel render.
+
+    Pressing Refresh Cache Info rescans the whole sequence. Instead, a tail
+    watches the sequence directory with a roputil.DirectoryWatcher and
+    folds the new frames in a roputil.SeqTail, then the cache info parm is
+    set at most every interval seconds with the write throughput and the
+    time left. The tail stops once every frame is written, when the node
+    is deleted, or when no frame was written for idle_timeout seconds. The
+    sequence is first scanned by the worker thread, not to block the UI.
+
+    Only used with a UI. By convention a single instance of this object
+    exists: roputil.tailer
+    """
+
+    def __init__(self, interval=1.0, poll_interval=0.25, idle_timeout=600.0):
+
+        self.__interval = interval
+        self.__poll_interval = poll_interval
+        self.__idle_timeout = idle_timeout
+        self.__lock = threading.Lock()
+        self.__tails = {} # {node session id: {'path', 'total', 'since', 'watcher', 'tail', 'parm', 'show_size', 'changed', 'polled', 'published'}}
+        self.__thread = None
+
+    def start(self, node, path, total_frames=None, show_size=True, parm_name='cacheinfo'):
+        """
+        Follow the files of a path written for a node.
+
+        Args:
+            node (hou.Node)          : The node showing the cache info.
+            path (str)               : The evaluated path of the files being written.
+            total_frames (int)       : Number of frames to write, for the time left.
+            show_size (bool)         : Include the total size of the files.
+            parm_name (str)          : The string parm that receives the info.
+        """
+        if not hou.isUIAvailable():
+            return
+        now = time.time()
+        entry = {'path': path, 'total': total_frames, 'since': now, 'watcher': None, 'tail': None,
+                 'parm': parm_name, 'show_size': show_size, 'changed': now, 'polled': 0, 'published': now}
+        with self.__lock:
+            previous = self.__tails.get(node.sessionId())
+            if previous is not None:
+                self.__close(previous)
+            self.__tails[node.sessionId()] = entry
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__run, name='ovfx-cache-tailer')
+                self.__thread.daemon = True
+                self.__thread.start()
+
+    def stop(self, node):
+        with self.__lock:
+            entry = self.__tails.pop(node.sessionId(), None)
+        if entry is not None:
+            self.__close(entry)
+
+    @staticmethod
+    def __close(entry):
+        if entry['watcher'] is not None:
+            entry['watcher'].close()
+
+    def __begin(self, session_id, entry):
+        """Scan the sequence and start watching its directory. Called from the worker thread."""
+        snapshot = scanner.snapshot(entry['path'])
+        mtimes = dict((name, mtime) for name, (size, mtime) in snapshot.files_info().items())
+        entry['tail'] = SeqTail(snapshot, entry['total'], since=entry['since'])
+        entry['watcher'] = DirectoryWatcher(snapshot.directory(), mtimes)
+        self.__publish(session_id, entry)
+
+    def tailing(self, node):
+        return node.sessionId() in self.__tails
+
+    def tail(self, node):
+        entry = self.__tails.get(node.sessionId())
+        return entry['tail'] if entry else None
+
+    def __publish(self, session_id, entry):
+        tail = entry['tail']
+        info = Node.file_info(tail.path(), entry['show_size'], snapshot=tail) + tail.info()
+        entry['published'] = time.time()
+        execute_deferred(self.__set_info, session_id, entry['parm'], info)
+
+    @staticmethod
+    def __set_info(session_id, parm_name, info):
+        node = hou.nodeBySessionId(session_id)
+        if node is not None and node.parm(parm_name).eval() != info:
+            node.parm(parm_name).set(info)
+
+    def __run(self):
+        try:
+            while True:
+                with self.__lock:
+                    items = list(self.__tails.items())
+                    if not items:
+                        self.__thread = None
+                        return
+                now = time.time()
+                for session_id, entry in items:
+                    try:
+                        self.__update(session_id, entry, now)
+                    except Exception: # Never stop the worker thread, drop the tail that failed
+                        with self.__lock:
+                            if self.__tails.get(session_id) is entry:
+                                del self.__tails[session_id]
+                        self.__close(entry)
+                time.sleep(self.__poll_interval)
+        finally: # Let start() run a new thread if this one died
+            with self.__lock:
+                if self.__thread is threading.current_thread():
+                    self.__thread = None
+
+    def __update(self, session_id, entry, now):
+        """Fold the new files of a tail and publish its info. Called from the worker thread."""
+        if entry['tail'] is None:
+            self.__begin(session_id, entry)
+            with self.__lock:
+                if self.__tails.get(session_id) is not entry: # Stopped while scanning
+                    self.__close(entry)
+                    return
+        watcher, tail = entry['watcher'], entry['tail']
+        if not watcher.uses_inotify(): # Listing the folder costs more, do it at the update rate
+            if now - entry['polled'] < self.__interval:
+                return
+            entry['polled'] = now
+        if tail.add(watcher.new_names()):
+            entry['changed'] = now
+        done = tail.complete() or now - entry['changed'] > self.__idle_timeout
+        if done:
+            with self.__lock:
+                if self.__tails.get(session_id) is entry:
+                    del self.__tails[session_id]
+            watcher.close()
+        if done or (entry['changed'] > entry['published'] and now - entry['published'] >= self.__interval):
+            self.__publish(session_id, entry)
+
+tailer = CacheTailer()
+
+
+class VersionIndex(object):
+    """
+    The versions of a cache element found on disk: the version folders
+    listed once under the element directory and the frame count of each
+    version.
+
+    Only the element directory is listed here. The frame counts come from
+    the roputil.scanner snapshots, scanned in its thread pool the first time
+    they are asked for, without writing the folder manifests.
+
+    The folders and file names are found from a read path raw value, where
+    the version channels are not expanded, e.g.
+    /cache/fx_setupA_cache0/v`chs("rver")`/name_v`chs("rver")``chs("rframe")`.bgeo.sc
+    """
+
+    VERSION_CHANNELS = ('rver', 'rverctrl')
+    MINOR_CHANNELS = ('rmin', 'rminctrl')
+    FRAME_CHANNELS = ('rframe',)
+
+    def __init__(self, raw):
+
+        self.__raw = raw
+        self.__directory, self.__folder, self.__file = self.split(raw)
+        self.__versions = collections.OrderedDict() # {(major, minor): (folder name, sequence path or None)}, sorted
+        self.__mtime = None # Element directory mtime when listed
+        self.__scan()
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} {} versions={}>'.format(cl.__module__, cl.__name__, self.__directory, len(self.__versions))
+        return result
+
+    @classmethod
+    def split(cls, raw):
+        """
+        Return the (element directory, version folder template, file template)
+        of a read path raw value, or (None, None, None) if the version is not
+        a folder of an evaluated directory.
+        """
+        parts = raw.split('/')
+        for index, part in enumerate(parts):
+            if cls.__channels(part) & set(cls.VERSION_CHANNELS):
+                directory = '/'.join(parts[:index])
+                if not directory or '`' in directory:
+                    break
+                return directory, part, '/'.join(parts[index + 1:])
+        return None, None, None
+
+    @staticmethod
+    def __channels(text):
+        channels = set()
+        for match in PathTemplate.EXPRESSION_RE.finditer(text):
+            channel = PathTemplate.CHANNEL_RE.match(match.group(1).strip())
+            channels.add(channel.group('name') if channel else None)
+        return channels
+
+    @classmethod
+    def pattern(cls, folder):
+        """Return the regex of a version folder template, None if it has other expressions"""
+        pattern, start, groups = '', 0, set()
+        for match in PathTemplate.EXPRESSION_RE.finditer(folder):
+            pattern += re.escape(folder[start:match.start()])
+            channel = PathTemplate.CHANNEL_RE.match(match.group(1).strip())
+            name = channel.group('name') if channel else None
+            if name in cls.VERSION_CHANNELS:
+                group = 'major'
+            elif name in cls.MINOR_CHANNELS:
+                group = 'minor'
+            else:
+                return None
+            pattern += '(?P={})'.format(group) if group in groups else r'(?P<{}>\d+)'.format(group)
+            groups.add(group)
+            start = match.end()
+        return re.compile('^{}{}$'.format(pattern, re.escape(folder[start:])))
+
+    def __substitute(self, template, major, minor):
+        """Return the file template of a version with its folder values, None if it has other expressions"""
+        def replace(match):
+            channel = PathTemplate.CHANNEL_RE.match(match.group(1).strip())
+            name = channel.group('name') if channel else None
+            if name in self.VERSION_CHANNELS:
+                return major
+            if name in self.MINOR_CHANNELS and minor is not None:
+                return minor
+            if name in self.FRAME_CHANNELS: # Any frame, only the head and tail of the names are used
+                return '.1'
+            raise KeyError(name)
+        try:
+            return PathTemplate.EXPRESSION_RE.sub(replace, template)
+        except KeyError: # Not a simple version or frame channel
+            return None
+
+    def mtime(self):
+        """Return the modification time of the element directory, None if missing or not a folder version"""
+        try:
+            return os.stat(self.__directory).st_mtime
+        except (OSError, TypeError):
+            return None
+
+    def fresh(self):
+        """
+        Whether no version folder was added or removed since the listing. The
+        frames written in a version folder don't change the element directory,
+        they are followed by the roputil.scanner snapshots of frame_count().
+        """
+        return self.__mtime == self.mtime()
+
+    def __scan(self):
+        if self.__directory is None:
+            return
+        regex = self.pattern(self.__folder)
+        try:
+            names = os.listdir(self.__directory)
+        except OSError: # Nothing written yet
+            names = []
+        found = []
+        for name in names:
+            match = regex.match(name) if regex else None
+            if match:
+                minor = match.groupdict().get('minor')
+                found.append(((int(match.group('major')), int(minor) if minor is not None else None), name, match.group('major'), minor))
+        found.sort(key=lambda item: (item[0][0], item[0][1] or 0))
+        for version, name, major, minor in found:
+            file_template = self.__substitute(self.__file, major, minor)
+            self.__versions[version] = (name, os.path.join(self.__directory, name, file_template) if file_template else None)
+        self.__mtime = self.mtime()
+
+    def raw(self):
+        return self.__raw
+
+    def directory(self):
+        return self.__directory
+
+    def versions(self):
+        """Return the (major, minor) versions found, oldest first. minor is None without minor version folders."""
+        return list(self.__versions)
+
+    def latest(self):
+        """Return the newest (major, minor) version or None"""
+        return next(reversed(self.__versions), None)
+
+    def folder(self, version):
+        entry = self.__versions.get(version)
+        return entry[0] if entry else None
+
+    def frame_count(self, version):
+        """
+        Return the number of frames of a version, None if unknown or not
+        scanned yet. A version that was not scanned is queued in roputil.scanner.
+        """
+        entry = self.__versions.get(version)
+        if entry is None or entry[1] is None:
+            return None
+        snapshot = scanner.request(entry[1])
+        return snapshot.count() if snapshot is not None else None
+
+
+class VersionIndexCache(object):
+    """
+    The roputil.VersionIndex of every cache element read by the nodes.
+    Nodes reading the same element share its index, which is listed again
+    only when its element directory changed, a single stat per lookup.
+
+    By convention a single instance of this object exists: roputil.versions
+    """
+
+    MAX_CACHE = 1000
+
+    def __init__(self):
+
+        self.__lock = threading.Lock()
+        self.__indices = {} # {read path raw value: roputil.VersionIndex}
+
+    def get(self, raw):
+        """Return the up to date roputil.VersionIndex of a read path raw value"""
+        with self.__lock:
+            index = self.__indices.get(raw)
+        if index is None or not index.fresh():
+            index = VersionIndex(raw)
+            with self.__lock:
+                if len(self.__indices) >= self.MAX_CACHE:
+                    self.__indices.clear()
+                self.__indices[raw] = index
+        return index
+
+    def clear(self):
+        with self.__lock:
+            self.__indices.clear()
+
+versions = VersionIndexCache()
+
+
+def frame_list(start, end, step=1):
+    """Return the frames from start to end included, e.g. [1001.0, 1001.5, 1002.0]"""
+    if step <= 0:
+        raise ValueError('The frame step must be positive, got {}'.format(step))
+    count = int(math.floor((end - start) / step + 1e-6)) + 1
+    return [start + i * step for i in range(max(count, 0))]
+
+def split_frames(frames, count):
+    """Split the frames into at most count contiguous chunks of nearly the same length"""
+    count = max(min(count, len(frames)), 1)
+    size, extra = divmod(len(frames), count)
+    chunks = []
+    start = 0
+    for i in range(count):
+        end = start + size + (1 if i < extra else 0)
+        if end > start:
+            chunks.append(frames[start:end])
+        start = end
+    return chunks
+
+def parse_wedges(numbers, names=''):
+    """
+    Return the wedges of a wedge set as (number, name) tuples.
+
+    Args:
+        numbers (str)    : Wedge numbers and ranges, e.g. '0-4 7'.
+        names (str)      : Optional names of the wedges separated by spaces, the number is used when missing.
+    """
+    result = []
+    for item in numbers.replace(',', ' ').split():
+        first, _, last = item.partition('-')
+        try:
+            first = int(first)
+            last = int(last) if last else first
+        except ValueError:
+            raise ValueError('Invalid wedge number or range: {}'.format(item))
+        result += [number for number in range(min(first, last), max(first, last) + 1) if number not in result]
+    names = names.split()
+    return [(number, names[i] if i < len(names) else str(number)) for i, number in enumerate(result)]
+
+
+class ParallelRender(object):
+    """
+    Write the frame range of a node with a pool of hython processes.
+
+    The frames are split into contiguous chunks, one per process, and each
+    process loads a copy of the scene and writes its frames by running this
+    module as a script. The copy is saved next to the scene and takes the
+    scene name once loaded, so $HIP and $HIPNAME are the ones of the
+    current session, and its nodes are not set up again. It is removed once
+    every process is done. The proxy of a frame is written right after the geometry, so
+    the SOP network is cooked once per frame for both. Only caches where
+    every frame is independent can be written this way, simulations need
+    the previous frames.
+
+    With wedges, each wedge writes the whole frame range in its own process
+    with $WEDGENUM and $WEDGE set, so simulations can be wedged too. At most
+    processes wedges run at once and each one reports the output path
+    resolved by roputil.Node.wedge_name().
+
+    The processes report each frame on their standard output. The progress
+    and finished callbacks receive this object and are called from the main
+    thread, so they can update the UI.
+    """
+    FRAME_PREFIX = 'OVFX_FRAME '
+    WEDGE_PREFIX = 'OVFX_WEDGE '
+    MAX_LOG_LINES = 20
+
+    __running = {} # {node session id: roputil.ParallelRender}
+
+    def __init__(self, node, hip_file=None, processes=0, proxy=False, frames=None, wedges=None):
+        """
+        Args:
+            node (hou.Node)      : The OVFX geometry cache node.
+            hip_file (str)       : A saved scene loaded by the processes, a copy of the current scene by default.
+            processes (int)      : The number of processes, 0 for the number of cores.
+            proxy (bool)         : Also write the proxy geometry.
+            frames (list)        : The frames to write, the node frame range by default.
+            wedges (list)        : (number, name) of the wedges to write, see roputil.parse_wedges().
+        """
+        self.__session_id = node.sessionId()
+        self.__node_path = node.path()
+        self.__hip_file = hip_file
+        self.__hip_name = None # The current scene path when the processes load a copy of it
+        self.__proxy = proxy
+        self.__frames = frames if frames is not None else self.node_frames(node)
+        self.__processes = processes if processes > 0 else (os.cpu_count() or 1)
+        self.__wedges = collections.OrderedDict() # {number: {'name', 'path', 'written', 'errors', 'state'}}
+        if wedges:
+            for number, name in wedges:
+                self.__wedges[number] = {'name': name, 'path': None, 'written': 0, 'errors': [], 'state': 'Queued'}
+            self.__chunks = [self.__frames] * len(self.__wedges) if self.__frames else []
+            self.__jobs = list(zip(self.__wedges, self.__chunks))
+        else:
+            self.__chunks = split_frames(self.__frames, self.__processes)
+            self.__jobs = [(None, chunk) for chunk in self.__chunks]
+        self.__lock = threading.Lock()
+        self.__popens = []
+        self.__written = []
+        self.__errors = [] # [message]
+        self.__cancelled = False
+        self.__done = False
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} {} written={}/{} processes={}>'.format(cl.__module__, cl.__name__, self.__node_path, len(self.__written), self.total(), min(len(self.__jobs), self.__processes))
+        return result
+
+    @classmethod
+    def running(cls, node):
+        """Return the parallel render running for a node or None"""
+        return cls.__running.get(node.sessionId())
+
+    @staticmethod
+    def node_frames(node):
+        """Return the frames written by the node, based on its frame range and substeps"""
+        if not node.evalParm('trange'): # Current frame only
+            return [hou.frame()]
+        step = node.evalParm('f3')
+        if step == 1: # Same as the internal Rop nodes
+            step = 1.0 / node.evalParm('substep')
+        return frame_list(node.evalParm('f1'), node.evalParm('f2'), step)
+
+    @staticmethod
+    def save_scene():
+        """
+        Save a copy of the current scene next to it without changing the
+        scene name or its unsaved changes. Return the path of the copy.
+        """
+        directory, basename = os.path.split(hou.hipFile.path())
+        name, ext = os.path.splitext(basename)
+        backup = hou.hipFile.saveAsBackup()
+        try:
+            handle, path = tempfile.mkstemp(prefix='.{}.ovfx_render.'.format(name), suffix=ext, dir=directory)
+        except OSError: # Read only folder
+            handle, path = tempfile.mkstemp(prefix='{}.ovfx_render.'.format(name), suffix=ext)
+        os.close(handle)
+        shutil.move(backup, path) # The backups don't pile up
+        return path
+
+    @staticmethod
+    def hython():
+        return os.path.join(hou.getenv('HFS') or os.environ.get('HFS', ''), 'bin', 'hython')
+
+    def command(self, frames, wedge=None):
+        """Return the command line writing a chunk of frames, of a wedge number if given"""
+        command = [self.hython(), os.path.abspath(__file__), self.__hip_file, self.__node_path,
+                   '--frames', ','.join(repr(frame) for frame in frames)]
+        if self.__proxy:
+            command.append('--proxy')
+        if self.__hip_name:
+            command += ['--hip-name', self.__hip_name]
+        if wedge is not None:
+            command += ['--wedge', str(wedge), '--wedge-name', self.__wedges[wedge]['name']]
+        return command
+
+    def node_path(self):
+        return self.__node_path
+
+    def frames(self):
+        return self.__frames
+
+    def chunks(self):
+        return self.__chunks
+
+    def wedges(self):
+        """
+        Return the status of each wedge, empty without wedges.
+
+        Returns:
+            {number: {'name': str, 'path': output path or None, 'written': int, 'errors': [str], 'state': str}}
+        """
+        with self.__lock:
+            return collections.OrderedDict((number, dict(status, errors=list(status['errors']))) for number, status in self.__wedges.items())
+
+    def written(self):
+        """Frames successfully written so far, of every wedge"""
+        return self.__written
+
+    def total(self):
+        """Number of frames to write, of every wedge"""
+        return len(self.__frames) * max(len(self.__wedges), 1)
+
+    def errors(self):
+        return self.__errors
+
+    def progress(self):
+        if not self.total():
+            return 1.0
+        return float(len(self.__written)) / self.total()
+
+    def done(self):
+        return self.__done
+
+    def cancel(self):
+        """Kill the running processes"""
+        self.__cancelled = True
+        with self.__lock:
+            popens = list(self.__popens)
+        for popen in popens:
+            if popen.poll() is None:
+                popen.terminate()
+
+    def cancelled(self):
+        return self.__cancelled
+
+    def start(self, progress=None, finished=None):
+        """
+        Launch the processes. When there is no UI, wait until they are done.
+
+        Args:
+            progress (function)   : progress(render) called after each frame.
+            finished (function)   : finished(render) called once every process is done.
+        """
+        if not self.__jobs: # Nothing to write
+            self.__done = True
+            if finished:
+                finished(self)
+            return self
+        if self.__hip_file is None:
+            self.__hip_name = hou.hipFile.path()
+            self.__hip_file = self.save_scene()
+
+        remaining = [len(self.__jobs)]
+        def run_job(wedge, frames):
+            try:
+                self.__run_chunk(frames, progress, wedge)
+            except Exception as e:
+                self.__add_error(wedge, 'Frames {} to {}: {}'.format(format_frame(frames[0]), format_frame(frames[-1]), e))
+            with self.__lock:
+                if wedge is not None:
+                    status = self.__wedges[wedge]
+                    status['state'] = 'Cancelled' if self.__cancelled else ('Failed' if status['errors'] else 'Done')
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if wedge is not None and progress:
+                execute_deferred(progress, self)
+            if last:
+                if self.__hip_name:
+                    try:
+                        os.unlink(self.__hip_file)
+                    except OSError: # Already removed
+                        pass
+                self.__done = True
+                ParallelRender.__running.pop(self.__session_id, None)
+                if finished:
+                    execute_deferred(finished, self)
+
+        ParallelRender.__running[self.__session_id] = self
+        executor = futures.ThreadPoolExecutor(max_workers=max(min(len(self.__jobs), self.__processes), 1))
+        for wedge, frames in self.__jobs:
+            executor.submit(run_job, wedge, frames)
+        executor.shutdown(wait=not hou.isUIAvailable())
+        return self
+
+    def __add_error(self, wedge, message):
+        with self.__lock:
+            if wedge is not None:
+                message = 'Wedge {}: {}'.format(wedge, message)
+                self.__wedges[wedge]['errors'].append(message)
+            self.__errors.append(message)
+
+    def __run_chunk(self, frames, progress, wedge=None):
+        if self.__cancelled:
+            return
+        if wedge is not None:
+            with self.__lock:
+                self.__wedges[wedge]['state'] = 'Writing'
+        popen = subprocess.Popen(self.command(frames, wedge), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        with self.__lock:
+            self.__popens.append(popen)
+        log = collections.deque(maxlen=self.MAX_LOG_LINES) # Last lines of the process output for the error report
+        for line in popen.stdout:
+            if wedge is not None and line.startswith(self.WEDGE_PREFIX):
+                with self.__lock:
+                    self.__wedges[wedge]['path'] = json.loads(line[len(self.WEDGE_PREFIX):]).get('path')
+                continue
+            if not line.startswith(self.FRAME_PREFIX):
+                log.append(line.rstrip())
+                continue
+            result = json.loads(line[len(self.FRAME_PREFIX):])
+            if result.get('error'):
+                self.__add_error(wedge, 'Frame {}: {}'.format(format_frame(result['frame']), result['error']))
+            else:
+                with self.__lock:
+                    self.__written.append(result['frame'])
+                    if wedge is not None:
+                        self.__wedges[wedge]['written'] += 1
+            if progress:
+                execute_deferred(progress, self)
+        returncode = popen.wait()
+        if returncode != 0 and not self.__cancelled:
+            self.__add_error(wedge, 'Frames {} to {}: the process exited with code {}\n{}'.format(
+                format_frame(frames[0]), format_frame(frames[-1]), returncode, '\n'.join(log)))
+
+
+def set_wedge(number, name):
+    """Set the $WEDGENUM and $WEDGE variables of the session, read by roputil.Node.wedge_name()"""
+    hou.putenv('WEDGENUM', str(int(number)))
+    hou.putenv('WEDGE', name) # Not parsed by hscript, the name can hold spaces, quotes or semicolons
+    hou.hscript('varchange')
+
+def render_frames(node_path, frames, proxy=False, stream=None, wedge=None):
+    """
+    Write frames of an OVFX geometry cache node one by one, the proxy right
+    after the geometry of each frame. Each frame is reported on the stream
+    for roputil.ParallelRender. With a wedge, the output path of the wedge
+    is reported first.
+
+    Returns:
+        The number of frames that failed
+    """
+    stream = stream or sys.stdout
+    node = hou.node(node_path)
+    if node is None:
+        raise KeyError('Cannot find the node {}'.format(node_path))
+    if wedge is not None and frames:
+        path = node.parm('sopoutput').evalAtFrame(frames[0])
+        stream.write('{}{}\n'.format(ParallelRender.WEDGE_PREFIX, json.dumps({'wedge': wedge, 'path': path})))
+        stream.flush()
+    rops = [node.node('write_geo')]
+    if proxy:
+        rops.append(node.node('write_proxy'))
+    if node.parm('staging').eval(): # Written straight to the output location, the main process never sees a staged frame
+        node.parm('staging').set(0)
+    failed = 0
+    for frame in frames:
+        result = {'frame': frame}
+        for rop in rops:
+            try:
+                rop.render(frame_range=(frame, frame), ignore_inputs=True)
+            except hou.Error as e:
+                result['error'] = '{}: {}'.format(rop.name(), e.instanceMessage())
+                failed += 1
+                break
+        stream.write('{}{}\n'.format(ParallelRender.FRAME_PREFIX, json.dumps(result)))
+        stream.flush()
+    return failed
+
+def main(args=None):
+    """Command line of the processes launched by roputil.ParallelRender, run with hython"""
+    parser = argparse.ArgumentParser(description='Write the frames of an OVFX geometry cache node.')
+    parser.add_argument('hip_file', help='The scene to load.')
+    parser.add_argument('node', help='The path of the OVFX geometry cache node.')
+    parser.add_argument('--frames', required=True, help='Comma separated frames to write.')
+    parser.add_argument('--proxy', action='store_true', help='Also write the proxy geometry.')
+    parser.add_argument('--hip-name', help='The scene path to take once loaded, when hip_file is a copy of it.')
+    parser.add_argument('--wedge', type=int, help='The wedge number, sets $WEDGENUM.')
+    parser.add_argument('--wedge-name', help='The wedge name, sets $WEDGE. The wedge number by default.')
+    args = parser.parse_args(args)
+
+    types.set_enabled(False) # The nodes were set up by the main process, the context may not resolve from the copy
+    hou.hipFile.load(args.hip_file, suppress_save_prompt=True, ignore_load_warnings=True)
+    if args.hip_name: # $HIP and $HIPNAME of the output paths are the ones of the main process
+        hou.hipFile.setName(args.hip_name)
+    scanner.set_enabled(False) # The cache info is refreshed once by the main process
+    if args.wedge is not None:
+        set_wedge(args.wedge, args.wedge_name or str(args.wedge))
+    frames = [float(frame) for frame in args.frames.split(',')]
+    return 1 if render_frames(args.node, frames, proxy=args.proxy, wedge=args.wedge) else 0
+
+
+class PathTemplate(object):
+    """
+    A path parm raw value split once into literal and backtick expression
+    tokens, e.g. '$HIP/geo/`chs("elem")`_v`chs("wver")`.bgeo.sc'.
+
+    The read paths are derived from the output path by swapping the write
+    channels for the read ones. Expanding a template evaluates the tokens
+    directly instead of setting a parm, evaluating it and replacing back
+    placeholders. Templates are compiled once per raw value.
+    """
+    EXPRESSION_RE = re.compile(r'`([^`]*)`')
+    CHANNEL_RE = re.compile(r'^(?P<func>chs?)\(\s*"(?P<name>[^"/]+)"\s*\)$')
+    LOCAL_VARIABLE_RE = re.compile(r'\$\{?(OS|OPNAME|OPID|CH|CHNAME)\b') # Variables only known by the parm evaluation
+    READ_CHANNELS = {'wver': 'rver', 'wmin': 'rmin', 'wminctrl': 'rminctrl', 'wframe': 'rframe'}
+    PROXY_CHANNELS = {'elem': 'elemprx'}
+    MAX_CACHE = 1000
+
+    __cache = {} # {(raw value, swapped channels): roputil.PathTemplate}
+
+    def __init__(self, raw):
+
+        self.__raw = raw
+        self.__tokens = [] # [(text, channel function, channel name)], the function is None for literals and complex expressions
+        self.__compiled = True # False when an expression or a variable needs the real parm evaluation
+        start = 0
+        for match in self.EXPRESSION_RE.finditer(raw):
+            if match.start() > start:
+                self.__add_literal(raw[start:match.start()])
+            channel = self.CHANNEL_RE.match(match.group(1).strip())
+            if channel:
+                self.__tokens.append((match.group(0), channel.group('func'), channel.group('name')))
+            else: # Any other expression is kept with its backticks
+                self.__tokens.append((match.group(0), None, None))
+                self.__compiled = False
+            start = match.end()
+        if start < len(raw):
+            self.__add_literal(raw[start:])
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} "{}">'.format(cl.__module__, cl.__name__, self.__raw)
+        return result
+
+    def __add_literal(self, text):
+        if self.LOCAL_VARIABLE_RE.search(text):
+            self.__compiled = False
+        self.__tokens.append((text, None, None))
+
+    @classmethod
+    def compile(cls, raw, channels=None):
+        """
+        Return the template of a raw value, optionally with swapped channels.
+
+        Args:
+            raw (str)         : The parm raw value.
+            channels (dict)   : {channel: replacement channel} to swap in the expressions.
+
+        Returns:
+            The memoized roputil.PathTemplate
+        """
+        key = (raw, tuple(sorted(channels.items())) if channels else ())
+        template = cls.__cache.get(key)
+        if template is None:
+            if len(cls.__cache) >= cls.MAX_CACHE:
+                cls.__cache.clear()
+            template = cls.compile(raw).swap(channels) if channels else cls(raw)
+            cls.__cache[key] = template
+        return template
+
+    @classmethod
+    def read(cls, raw, proxy=False):
+        """Return the read template of an output path raw value"""
+        channels = dict(cls.READ_CHANNELS)
+        if proxy:
+            channels.update(cls.PROXY_CHANNELS)
+        return cls.compile(raw, channels)
+
+    @classmethod
+    def proxy(cls, raw):
+        """Return the proxy output template of an output path raw value"""
+        return cls.compile(raw, cls.PROXY_CHANNELS)
+
+    def raw(self):
+        return self.__raw
+
+    def compiled(self):
+        """False when the template can only be expanded by a parm evaluation"""
+        return self.__compiled
+
+    def swap(self, channels):
+        """Return a new template where the channels of the simple expressions are replaced"""
+        result = ''
+        for text, func, name in self.__tokens:
+            if func is None:
+                result += text
+            else:
+                result += '`{}("{}")`'.format(func, channels.get(name, name))
+        return PathTemplate(result)
+
+    def expand(self, node, keep=()):
+        """
+        Evaluate the template for a node.
+
+        Args:
+            node (hou.Node)       : The node holding the channels.
+            keep (list)           : Channels kept as expressions in the result.
+
+        Returns:
+            The expanded string or None when the template is not compiled
+        """
+        if not self.__compiled:
+            return None
+        result = ''
+        for text, func, name in self.__tokens:
+            if func is None: # Literal
+                result += hou.text.expandString(text)
+            elif name in keep:
+                result += text
+            else:
+                parm = node.parm(name)
+                if parm is None: # Same as Houdini, a missing channel evaluates to an empty string
+                    continue
+                result += parm.evalAsString() if func == 'chs' else str(format_frame(parm.eval()))
+        return result
+
+    def expand_with_parm(self, parm, keep=()):
+        """
+        Evaluate the template with a parm, for the templates that can't be
+        compiled. The kept channels are replaced by placeholders while the
+        parm is evaluated.
+
+        Args:
+            parm (hou.Parm)       : A string parm of the node used for the evaluation.
+            keep (list)           : Channels kept as expressions in the result.
+
+        Returns:
+            The expanded string
+        """
+        placeholders = {}
+        value = ''
+        for text, func, name in self.__tokens:
+            if func is not None and name in keep:
+                placeholder = 'OVFX_TMP_{}_EXP'.format(name.upper())
+                placeholders[placeholder] = text
+                value += placeholder
+            else:
+                value += text
+        parm.set(value)
+        value = parm.eval()
+        for placeholder, text in placeholders.items():
+            value = value.replace(placeholder, text)
+        return value
+
+
+class FrameTable(object):
+    """
+    Precomputed frame suffixes, e.g. '.1001' or '.1001.25', and substep
+    decimals used by the wframe and rframe expressions of every node.
+
+    A suffix only depends on the frame rounded to 2 decimals and on the
+    padding so the table is keyed by both and never holds a stale value.
+    A miss warms the whole frame range of the node, with its substeps, in
+    one pass so the next cooks are served from the table.
+
+    By convention a single instance of this object exists: roputil.frames
+    """
+    MAX_SIZE = 200000
+
+    def __init__(self):
+
+        self.__suffixes = {} # {(centi frame, padding): suffix}
+        self.__decimals = {} # {substep: [decimal of each substep]}
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} suffixes={}>'.format(cl.__module__, cl.__name__, len(self.__suffixes))
+        return result
+
+    @staticmethod
+    def centi_frame(frame):
+        """Return the frame rounded to 2 decimals as an int, e.g. 100125 for 1001.25"""
+        return int(round(frame * 100))
+
+    @staticmethod
+    def format_suffix(centi_frame, padding):
+        """Return the suffix of a centi frame, the integer part is padded and a null decimal is removed"""
+        rounded = str(centi_frame / 100)
+        if '.' in rounded:
+            frame, decim = rounded.split('.')
+            decim = '' if decim == '0' else '.{}'.format(decim)
+        else:
+            frame = rounded
+            decim = ''
+        return '.{}{}'.format(frame.zfill(padding), decim)
+
+    def clear(self):
+        self.__suffixes.clear()
+        self.__decimals.clear()
+
+    def warm(self, start, end, substep, padding):
+        """
+        Compute the suffixes of every substep of a frame range.
+
+        Args:
+            start (float)    : The first frame.
+            end (float)      : The last frame.
+            substep (int)    : The number of steps per frame.
+            padding (int)    : The frame padding.
+        """
+        if len(self.__suffixes) >= self.MAX_SIZE:
+            self.__suffixes.clear()
+        substep = max(int(substep), 1)
+        count = int(round((end - start) * substep)) + 1
+        centi_frames = set(self.centi_frame(start + float(i) / substep) for i in range(max(count, 1)))
+        format_suffix = self.format_suffix
+        self.__suffixes.update(((centi, padding), format_suffix(centi, padding)) for centi in centi_frames if (centi, padding) not in self.__suffixes)
+
+    def suffix(self, frame, padding, compute=True):
+        """
+        Return the suffix of a frame from the table.
+
+        Args:
+            frame (float)     : The frame.
+            padding (int)     : The frame padding.
+            compute (bool)    : Compute and store a missing suffix, otherwise return None.
+        """
+        key = (self.centi_frame(frame), padding)
+        suffix = self.__suffixes.get(key)
+        if suffix is None and compute:
+            suffix = self.format_suffix(key[0], padding)
+            self.__suffixes[key] = suffix
+        return suffix
+
+    def decimals(self, substep):
+        """Return the decimals of each substep of a frame rounded to 2 decimals, e.g. [0.0, 0.33, 0.67, 1.0]"""
+        decimals = self.__decimals.get(substep)
+        if decimals is None:
+            decimals = [int(round(1.0 / substep * i * 100)) / 100 for i in range(int(substep) + 1)]
+            self.__decimals[substep] = decimals
+        return decimals
+
+    def round_frame(self, frame, substep, method='nearest'):
+        """
+        Round a frame to a substep.
+
+        Args:
+            frame (float)     : The frame to round.
+            substep (int)     : The number of steps per frame.
+            method (str)      : 'previous', 'next' or 'nearest'.
+
+        Returns:
+            The rounded frame as a float
+        """
+        decim = (frame - int(frame)) * substep
+        if method == 'previous':
+            index = math.floor(decim)
+        elif method == 'next':
+            index = math.ceil(decim)
+        else:
+            index = round(decim)
+        index = int(index)
+        decimals = self.decimals(substep)
+        if 0 <= index < len(decimals):
+            decim = decimals[index]
+        else: # Negative frames go below the first substep
+            decim = int(round(1.0 / substep * index * 100)) / 100
+        return float(decim + int(frame))
+
+frames = FrameTable()
+
+
+class InitializeReport(object):
+    """
+    Summary of a roputil.Node.initialize_nodes() call
+    """
+
+    def __init__(self):
+
+        self.__touched = []
+        self.__skipped = []
+        self.__disabled = []
+        self.__deferred = []
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} touched={} skipped={} disabled={} deferred={}>'.format(cl.__module__, cl.__name__, len(self.__touched), len(self.__skipped), len(self.__disabled), len(self.__deferred))
+        return result
+
+    def add_touched(self, node):
+        self.__touched.append(node)
+
+    def add_skipped(self, node):
+        self.__skipped.append(node)
+
+    def add_disabled(self, node):
+        self.__disabled.append(node)
+
+    def add_deferred(self, node):
+        self.__deferred.append(node)
+
+    def touched(self):
+        """Nodes that were set up"""
+        return self.__touched
+
+    def skipped(self):
+        """Nodes that were left untouched because their fingerprint didn't change"""
+        return self.__skipped
+
+    def disabled(self):
+        """Nodes that were left untouched because their Auto Update parm is off"""
+        return self.__disabled
+
+    def deferred(self):
+        """Nodes marked dirty, set up later by roputil.instances.flush()"""
+        return self.__deferred
+
+
+class Node(object):
+    """
+    Used to hold file cache settings and manage nodes refresh
+
+    By convention an instance of this object is created on the hou object, e.g hou.ovfx['rop']['Sop']['geo'], hou.ovfx['rop']['Driver'], hou.ovfx['rop']['Sop']['abc']
+    """
+
+    def __init__(self, node_category, node_type, version=1, version_padding=3, frame_padding=4, element_separator='-'):
+
+        self.__node_category = node_category
+        self.__node_type = node_type
+        self.__version = version
+        self.__version_padding = version_padding
+        self.__frame_padding = frame_padding
+        self.__element_separator = element_separator
+
+        self.__paths = collections.OrderedDict()
+        self.__frame_ranges = collections.OrderedDict()
+        self.__callbacks = {}
+
+        self.__parms = collections.OrderedDict() # {name: roputil.Parm}
+        self.__menus = collections.OrderedDict() # {name: roputil.Menu}
+        self.__buttons = collections.OrderedDict() # {name: roputil.Button}
+        self.__deferred = False
+
+    def initialize_nodes(self):
+        """
+        Iterates through all nodes of the specified type in the scene and
+        and run the initialize setup if the Auto Update parameter is checked.
+
+        This is usually run when the shot/asset context is updated.
+
+        Nodes whose fingerprint didn't change since their last setup are
+        skipped entirely. In deferred mode the nodes are only marked dirty,
+        see set_deferred().
+
+        Returns:
+            A roputil.InitializeReport of the touched and skipped nodes.
+        """
+        return types.initialize_nodes([self])
+
+    def setup_if_outdated(self, node, report=None, definition=None):
+        """
+        Run the setup of a node if its Auto Update parameter is checked and
+        its fingerprint changed.
+
+        Args:
+            node (hou.Node)                      : The node to set up.
+            report (roputil.InitializeReport)    : Receives the node as touched, skipped or disabled.
+            definition (str)                     : The definition_fingerprint(), computed if None.
+
+        Returns:
+            True if the node was set up
+        """
+        report = report if report is not None else InitializeReport()
+        if node.parm('autoupdate').eval() != True:
+            report.add_disabled(node)
+            return False
+        if node.userData(FINGERPRINT_USER_DATA) == self.fingerprint(node, definition):
+            # The setup callback can depend on the context, not only on the configuration
+            self.run_setup_callback(node)
+            report.add_skipped(node)
+            return False
+        node.hdaModule().setup_node(node)
+        report.add_touched(node)
+        return True
+
+    def set_deferred(self, deferred=True):
+        """
+        In deferred mode, initialize_nodes() only marks the nodes dirty. A
+        node is set up when it is selected, before it renders, before the
+        scene is saved or when roputil.instances.flush() or flush() is called.
+        Without the UI, e.g. in hython or on the farm, nothing selects the
+        nodes so the setup stays eager.
+        """
+        self.__deferred = deferred and hou.isUIAvailable()
+
+    def deferred(self):
+        return self.__deferred
+
+    def flush(self, node=None):
+        """Set up the dirty nodes of this type, or a single node, see roputil.InstanceRegistry.flush()"""
+        if node is not None:
+            return instances.flush(node)
+        return instances.flush(definition=self)
+
+    @profiled('Node.nodes')
+    def nodes(self):
+        """Return all the nodes of this type in the scene from the roputil.instances registry"""
+        return instances.nodes(self.__node_category, self.__node_type)
+
+    def definition_fingerprint(self):
+        """
+        Return a hash of everything registered on this instance: parms,
+        presets, languages, menus, buttons and callbacks.
+        """
+        callbacks = [(name, self.callback_signature(func)) for name, func in sorted(self.__callbacks.items())]
+        return digest(self.__version,
+                      self.__version_padding,
+                      self.__frame_padding,
+                      self.__element_separator,
+                      [parm.signature() for parm in self.__parms.values()],
+                      [menu.signature() for menu in self.__menus.values()],
+                      [button.signature() for button in self.__buttons.values()],
+                      callbacks)
+
+    def to_dict(self):
+        """
+        Return the definition as JSON compatible data: settings, parms,
+        presets, menus and buttons. The callbacks are functions of the
+        configuration script so they are not included.
+        """
+        return {'node_category': self.__node_category,
+                'node_type': self.__node_type,
+                'version': self.__version,
+                'version_padding': self.__version_padding,
+                'frame_padding': self.__frame_padding,
+                'element_separator': self.__element_separator,
+                'parms': [parm.to_dict() for parm in self.__parms.values()],
+                'menus': [menu.to_dict() for menu in self.__menus.values()],
+                'buttons': [button.to_dict() for button in self.__buttons.values()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create a roputil.Node from the data of roputil.Node.to_dict(). The JSON lists are restored as tuples."""
+        def restore(value):
+            if isinstance(value, list):
+                return tuple(restore(v) for v in value)
+            return value
+
+        node = cls(data['node_category'], data['node_type'], version=data['version'], version_padding=data['version_padding'],
+                   frame_padding=data['frame_padding'], element_separator=data['element_separator'])
+        for parm_data in data['parms']:
+            parm = node.add_parm(parm_data['name'], bound_menu=restore(parm_data['bound_menu']))
+            for key, value, language in parm_data['presets']:
+                parm.add_preset(restore(key), restore(value), language=restore(language), is_template=parm_data['is_template'])
+        for menu_data in data['menus']:
+            node.add_menu(menu_data['name'], menu_data['label'], menu_data['adjacent_parm'], position=menu_data['position'],
+                          callback=menu_data['callback'], values=menu_data['values'])
+        for button_data in data['buttons']:
+            node.add_button(button_data['name'], button_data['label'], button_data['adjacent_parm'], position=button_data['position'],
+                            callback=button_data['callback'])
+        return node
+
+    @classmethod
+    def callback_signature(cls, func):
+        """
+        Return what defines a callback: its name, bytecode, constants, default
+        arguments and closure values. Nested functions are described the same
+        way so the signature is stable across sessions.
+        """
+        def describe(value):
+            if inspect.iscode(value):
+                return (value.co_name, value.co_code, value.co_names, tuple(describe(const) for const in value.co_consts))
+            if inspect.isfunction(value):
+                return cls.callback_signature(value)
+            if isinstance(value, (tuple, list)):
+                return tuple(describe(item) for item in value)
+            return repr(value)
+
+        code = getattr(func, '__code__', None)
+        if code is None: # Not a Python function, e.g. a builtin or a callable object
+            return (getattr(func, '__qualname__', None), repr(func))
+        closure = []
+        for cell in func.__closure__ or ():
+            try:
+                closure.append(describe(cell.cell_contents))
+            except ValueError: # Empty cell
+                closure.append(None)
+        return (func.__qualname__, describe(code), describe(func.__defaults__), describe(func.__kwdefaults__), tuple(closure))
+
+    def run_setup_callback(self, node):
+        """Run the optional 'setup' callback of the configuration on a node"""
+        callback = self.callback('setup')
+        if callback: # a callback exists
+            with profiler.phase('setup callback', node):
+                callback(node)
+
+    @staticmethod
+    def hda_signature(node):
+        """
+        Return the library path, version and modification time of the HDA
+        definition of a node, so an upgraded HDA sets its nodes up again.
+        """
+        hda = node.type().definition()
+        if hda is None: # Not a digital asset
+            return None
+        return (hda.libraryFilePath(), hda.version(), hda.modificationTime())
+
+    def fingerprint(self, node, definition=None):
+        """
+        Return the fingerprint of a node: the definition fingerprint combined
+        with its HDA definition and the node local inputs like the menu selections.
+
+        Args:
+            node (hou.Node)          : The node to fingerprint.
+            definition (str)         : The definition_fingerprint(), to avoid recomputing it for every node.
+        """
+        if definition is None:
+            definition = self.definition_fingerprint()
+        return digest(definition, self.hda_signature(node), [menu.selection(node) for menu in self.__menus.values()])
+
+    @staticmethod
+    def cleanup_user_data(node):
+        """
+        Remove all user data related to this class.
+
+        The cleanup needs to happen when a new node instance is created to
+        prevent having old data from the original node used to save the HDA.
+        """
+        for key in node.userDataDict().keys():
+            ovfx_key = 'ovfx:presets:'
+            if key[:len(ovfx_key)] == ovfx_key or key == FINGERPRINT_USER_DATA:
+                node.destroyUserData(key)
+
+    @staticmethod
+    def delete_ovfx_parms(node, group=None):
+        """
+        Delete all spare parameters with the tag attribute is_ovfx_parm=1.
+
+        This tag attribute is attribute is added to all dynamic parameters created
+        by the ovfx tool like preset menus or push buttons.
+
+        When a parmTemplateGroup is given, the parameters are only removed from
+        that group and the caller is responsible for committing it on the node.
+        """
+        g = node.parmTemplateGroup() if group is None else group
+        for p in node.parms():
+            if 'is_ovfx_parm' in p.parmTemplate().tags():
+                if 'ovfx_join_parm' in p.parmTemplate().tags():
+                    join_parm_name = p.parmTemplate().tags()['ovfx_join_parm']
+                    t = g.find(join_parm_name)
+                    if t is not None: # the parameter might have already been removed
+                        t.setJoinWithNext(False) # Uncheck the join with next parm
+                        g.replace(join_parm_name, t)
+                g.remove(p.parmTemplate()) # Remove the parm
+        if group is None: # Commit right away
+            node.setParmTemplateGroup(g)
+
+    @profiled('Node.setup_parms')
+    def setup_parms(self, node, force=False):
+        """
+        Recreate the dynamic parameters and apply the presets on a node using
+        a single parmTemplateGroup.
+
+        The parm removals, menus, buttons and template defaults are all applied
+        in memory on the same parmTemplateGroup which is committed on the node
+        only once, and only if it differs from the current one. Committing a
+        parmTemplateGroup re-lays-out the node and triggers the callbacks so
+        this is where most of the setup time goes.
+
+        The node fingerprint is stored in its user data so initialize_nodes()
+        can skip the node until the configuration or its menu selections change.
+
+        Returns:
+            True if the parmTemplateGroup had to be committed on the node.
+        """
+        # Menus with new values are reset to their first item like when they are first created
+        reset_menus = [menu for menu in self.__menus.values() if force or menu.outdated(node)]
+        for menu in reset_menus:
+            if node.parm(menu.name()): # Reset now so the template presets pick the right key
+                node.parm(menu.name()).set(0)
+
+        g = node.parmTemplateGroup()
+        current = g.asDialogScript()
+        self.delete_ovfx_parms(node, group=g)
+        for menu in self.__menus.values():
+            menu.create(node, force=True, group=g)
+        for button in self.__buttons.values():
+            button.create(node, group=g)
+        templates = []
+        for parm in self.__parms.values():
+            if parm.is_template() and parm.apply_preset(node, force=force, group=g):
+                templates.append(parm)
+
+        committed = g.asDialogScript() != current
+        if committed:
+            node.setParmTemplateGroup(g)
+            for menu in reset_menus:
+                node.parm(menu.name()).set(0)
+        for parm in templates: # Pick the new default values from the committed group
+            parm.revert_to_defaults(node)
+
+        # Parms that are set directly don't need a parmTemplateGroup
+        for parm in self.__parms.values():
+            if not parm.is_template():
+                parm.apply_preset(node, force=force)
+
+        node.setUserData(FINGERPRINT_USER_DATA, self.fingerprint(node))
+        return committed
+
+    @staticmethod
+    @profiled('Node.file_info')
+    def file_info(path, show_size=True, snapshot=None, frames=None):
+        """
+        Return the file information like the frame count, frame range and
+        date range of the files found on disk that match the input path
+
+        Args:
+            path (str)               : The evaluated path of the files.
+            show_size (bool)         : Include the total size of the files.
+            snapshot (SeqSnapshot)   : An existing snapshot of the path, e.g. from roputil.scanner.
+            frames (tuple)           : The frames rendered by the node to add the
+                                       roputil.SeqIntegrity summary of a sequence.
+        """
+        def file_date(mtime):
+            return time.ctime(mtime)
+
+        seq = snapshot if snapshot is not None else SeqSnapshot(path)
+        info = 'No Files Found'
+        count = seq.count()
+
+        if count:
+            info = 'Total File(s): {}'.format(count)
+            if count == 1:
+                if seq.is_seq():
+                    info += '\nFrame        : {}'.format(seq.first_frame())
+                else: # Static Frame
+                    info += '\nFrame        : Static'
+                if show_size:
+                    info += '\nSize         : {}'.format(format_size(seq.size()))
+                info += '\nDate         : {}'.format(file_date(seq.first_mtime()))
+            else: # more than one file
+                info += '\nFrames       : {} - {}'.format(seq.first_frame(), seq.last_frame())
+                if show_size:
+                    info += '\nSize         : {}'.format(format_size(seq.size()))
+                info += '\nDate     From: {}'.format(file_date(seq.first_mtime()))
+                info += '\n           To: {}'.format(file_date(seq.last_mtime()))
+                time_diff = seq.time_diff()
+                hour = int(time_diff / 3600)
+                minute = int((time_diff - (hour * 3600)) / 60)
+                second = round(time_diff - (hour * 3600) - (minute * 60))
+                info += '\n     Time Diff: {}h {}m {}s'.format(hour, minute, second)
+            if frames is not None and seq.is_seq():
+                try:
+                    info += SeqIntegrity(seq, frames).summary()
+                except ImportError: # NumPy is missing from this Python
+                    info += '\nIntegrity    : integrity check needs numpy'
+        return info
+
+    @staticmethod
+    def wedge_info(render, show_size=True, force=False):
+        """
+        Return the status and files found on disk of each wedge of a
+        roputil.ParallelRender, one line per wedge.
+
+        Args:
+            render (ParallelRender)  : The render of the wedges.
+            show_size (bool)         : Include the total size of the files of each wedge.
+            force (bool)             : Rescan the files even if their directory didn't change.
+        """
+        lines = []
+        for number, status in render.wedges().items():
+            line = 'Wedge {} ({}): {}, {}/{} frames'.format(number, status['name'], status['state'], status['written'], len(render.frames()))
+            if status['path'] and status['state'] not in ('Queued', 'Writing'):
+                seq = scanner.snapshot(status['path'], force=force)
+                line += ', {} file(s)'.format(seq.count())
+                if show_size and seq.count():
+                    line += ', {}'.format(format_size(seq.size()))
+            if status['errors']:
+                line += ', {} error(s)'.format(len(status['errors']))
+            lines.append(line)
+        return '\n'.join(lines)
+
+    @staticmethod
+    def rendered_frames(node):
+        """Return the frames rendered by a node as a tuple, like roputil.ParallelRender.node_frames()"""
+        return tuple(ParallelRender.node_frames(node))
+
+    @staticmethod
+    def integrity_report(node, path):
+        """Return the full roputil.SeqIntegrity report of the files of a path against the node frame range"""
+        seq = scanner.snapshot(path)
+        if not seq.count():
+            return 'No Files Found'
+        if not seq.is_seq():
+            return 'Static Frame'
+        try:
+            return SeqIntegrity(seq, Node.rendered_frames(node)).report()
+        except ImportError: # NumPy is missing from this Python
+            return 'The integrity check needs numpy'
+
+    @staticmethod
+    def update_cache_info(node, path, show_size=True, force=False, parm_name='cacheinfo', integrity=False):
+        """
+        Fill the cache info parm of a node from the roputil.scanner.
+
+        The parm shows a scanning message until the background scan is done.
+
+        Args:
+            node (hou.Node)          : The node to update.
+            path (str)               : The evaluated path of the files to scan.
+            show_size (bool)         : Include the total size of the files.
+            force (bool)             : Rescan the files even if the directory didn't change.
+            parm_name (str)          : The string parm that receives the info.
+            integrity (bool)         : Add the integrity summary against the frames rendered by the node,
+                                       or a note when NumPy is missing.
+        """
+        frames = Node.rendered_frames(node) if integrity else None
+        scanner.update_parm(node.parm(parm_name), path, show_size, force=force, frames=frames)
+
+    @staticmethod
+    def set_if_changed(parm, value):
+        """Set a parm only when its raw value differs, so the scene is not marked as modified for nothing"""
+        if parm.rawValue() != value:
+            parm.set(value)
+            return True
+        return False
+
+    def update_proxy_output(self, node, output_parm='sopoutput', proxy_parm='prxsopoutput'):
+        """Set the proxy output path from the output path, with the proxy element name"""
+        template = PathTemplate.proxy(node.parm(output_parm).rawValue())
+        return self.set_if_changed(node.parm(proxy_parm), template.raw())
+
+    def update_staged_output(self, node, output_parms=('sopoutput', 'prxsopoutput'), staged_parms=('stgsopoutput', 'stgprxsopoutput')):
+        """Set the staged output paths from the output paths, moved under the roputil.stager scratch folder"""
+        modified = False
+        for output_parm, staged_parm in zip(output_parms, staged_parms):
+            template = CacheStager.local_template(node.parm(output_parm).rawValue())
+            modified = self.set_if_changed(node.parm(staged_parm), template) or modified
+        return modified
+
+    @profiled('Node.update_read_paths')
+    def update_read_paths(self, node, output_parm='sopoutput', read_parm='rpath', proxy_read_parm='prxrpath'):
+        """
+        Set the read paths from the output path. Everything is evaluated
+        except the read version, minor version and frame expressions.
+
+        Each parm is set once and only when its value changed. Output paths
+        with expressions other than simple channel references are evaluated
+        with the read parm instead.
+
+        Args:
+            node (hou.Node)          : The node to update.
+            output_parm (str)        : The parm with the output path.
+            read_parm (str)          : The parm receiving the read path.
+            proxy_read_parm (str)    : The parm receiving the proxy read path.
+
+        Returns:
+            True if at least one parm was modified
+        """
+        raw = node.parm(output_parm).rawValue()
+        keep = PathTemplate.READ_CHANNELS.values()
+        modified = False
+        for parm_name, proxy in ((read_parm, False), (proxy_read_parm, True)):
+            template = PathTemplate.read(raw, proxy=proxy)
+            parm = node.parm(parm_name)
+            value = template.expand(node, keep=keep)
+            if value is None: # Not compiled, fallback on the parm evaluation
+                value = template.expand_with_parm(parm, keep=keep)
+            modified = self.set_if_changed(parm, value) or modified
+        return modified
+
+    def format_version(self, version):
+        """
+        Return the version with the padding. Uses the instance number of padding "version_padding"
+
+        Args:
+            version (int | string)       : The integer version you want to format with padding.
+
+        Returns:
+            Padded version, e.g. 011
+        """
+        if type(version) == str: # convert the string to an int to get rid of existing padding
+            version = int(version)
+        version = str(version)
+
+        return version.zfill(self.__version_padding)
+
+    def add_parm(self, name, bound_menu=None):
+        self.__parms.pop(name, None) # Delete the existing so we can recreate it
+        parm = self.__parms[name] = Parm(self, name, bound_menu)
+        return parm
+
+    def parm(self, name):
+        if name not in self.__parms:
+            raise KeyError('roputil.Parm "{}" cannot be found in roputil.Node "{}".'.format(name, self))
+        return self.__parms[name]
+
+    def parms(self):
+        return list(self.__parms.values())
+
+    def add_menu(self, name, label, adjacent_parm ,position='join', callback=None, values=[]):
+        if name not in self.__menus: # make sure it doesn't already exists
+            self.__menus[name] = Menu(name, label, adjacent_parm, position, callback, values)
+
+    def menu(self, name):
+        return self.__menus.get(name)
+
+    def menus(self):
+        return list(self.__menus.values())
+
+    def create_menus(self, node, force=False):
+        for menu in self.menus():
+            if menu.create(node, force=force): # The menu was successfully (re)created
+                node.parm(menu.name()).set(0) # Every time a menu is recreated we initialize the selection
+
+    def add_button(self, name, label, adjacent_parm ,position='join', callback=None):
+        if name not in self.__buttons: # make sure it doesn't already exists
+            self.__buttons[name] = Button(name, label, adjacent_parm, position, callback)
+
+    def button(self, name):
+        return self.__buttons.get(name)
+
+    def buttons(self):
+        return list(self.__buttons.values())
+
+    def add_callback(self, parm_name, func):
+        self.__callbacks[parm_name] = func
+
+    def callback(self, parm_name):
+        if parm_name in self.__callbacks:
+            return self.__callbacks[parm_name]
+
+    def callbacks(self):
+        return self.__callbacks
+
+    def node_category(self):
+        return self.__node_category
+
+    def node_type(self):
+        return self.__node_type
+
+    def version_padding(self):
+        return self.__version_padding
+
+    def version(self):
+        return self.__version
+
+    def formatted_version(self):
+        return self.format_version(self.__version)
+
+    def read_version(self, node, read_parm='rpath', mode_parm='rvermode'):
+        """
+        Return the (major, minor) version the node reads: the newest version
+        found on disk in the "Latest On Disk" read mode, otherwise the scene
+        version and the write minor version.
+
+        Args:
+            node (hou.Node)     : The node reading the cache.
+            read_parm (str)     : The parm with the read path.
+            mode_parm (str)     : The read version mode parm, 1 reads the latest version on disk.
+
+        Returns:
+            (int, int) tuple
+        """
+        minor = node.parm('wminctrl').eval()
+        mode = node.parm(mode_parm)
+        if mode is not None and mode.eval() == 1:
+            latest = versions.get(node.parm(read_parm).rawValue()).latest()
+            if latest is not None:
+                return latest[0], latest[1] if latest[1] is not None else minor
+        return int(self.__version), minor
+
+    def version_menu(self, node, read_parm='rpath'):
+        """
+        Return the menu items of the versions found on disk, newest first,
+        with their frame count. The tokens are "major" or "major.minor".
+
+        Args:
+            node (hou.Node)     : The node reading the cache.
+            read_parm (str)     : The parm with the read path.
+
+        Returns:
+            Flat list of token, label
+        """
+        index = versions.get(node.parm(read_parm).rawValue())
+        items = []
+        for version in reversed(index.versions()):
+            count = index.frame_count(version)
+            token = str(version[0]) if version[1] is None else '{}.{}'.format(*version)
+            label = index.folder(version)
+            if count is not None:
+                label = '{}  ({} frame{})'.format(label, count, 's' if count != 1 else '')
+            items += [token, label]
+        return items
+
+    def frame_padding(self):
+        return self.__frame_padding
+
+    def frame_suffix(self, node, frame=None):
+        """
+        Return the frame portion of a file name from roputil.frames, e.g. '.1001' or '.1001.25'
+
+        The frame range of the node is computed at once the first time one of
+        its frames is missing from the table.
+
+        Args:
+            node (hou.Node)      : The Rop node.
+            frame (float)        : The frame, the current frame if None.
+
+        Returns:
+            The suffix or an empty string for a single file output
+        """
+        if node.parm('singlefile').evalAsInt():
+            return ''
+        if frame is None: # get the current frame
+            frame = hou.frame()
+        suffix = frames.suffix(frame, self.__frame_padding, compute=False)
+        if suffix is None: # Warm the node range
+            start, end = node.evalParm('f1'), node.evalParm('f2')
+            frames.warm(min(start, end), max(start, end), node.evalParm('substep'), self.__frame_padding)
+            suffix = frames.suffix(frame, self.__frame_padding)
+        return suffix
+
+    @staticmethod
+    def round_frame(node, frame, method='nearest'):
+        """Round a frame to the node substeps with 'previous', 'next' or 'nearest' method"""
+        return frames.round_frame(frame, node.parm('substep').eval(), method)
+
+    def element_name(self, node, add_prx=False):
+        parent = node
+        for i in range(node.parm('parentprefix').eval()):
+            parent = parent.parent()
+
+        name = node.name()
+        if add_prx: # Add the proxy suffixe
             name = '{}{}prx'.format(name, self.__element_separator)
         if parent == node:
             return name
@@ -503,3 +4339,373 @@ class Node(object):
             result = '{}{}'.format(self.__element_separator, hou.text.expandString('$WEDGE'))
 
         return result
+
+class PresetCache(object):
+    """
+    Keep the translated presets and the definition of a roputil.Node on
+    the local disk so a configuration script doesn't rebuild them for a
+    context it already saw.
+
+    The key is made of a hash of the configuration script and of the values
+    of every fragment it uses, found in its <fragment> templates and its
+    bundle('fragment') or frag('fragment') calls. Editing the script or
+    changing the context makes a new key. The cache folder is set by the
+    OVFX_ROP_CACHE_DIR environment variable, ~/.cache/ovfx-houdini-rop by
+    default. The cache is disabled when the script source can't be read.
+
+    Usage in a configuration script:
+        cache = roputil.PresetCache()
+        geo = cache.load()
+        if geo is None: # New context or configuration
+            geo = roputil.Node(...)
+            # add the parms, presets, menus and buttons
+            cache.save(geo)
+        geo.add_callback('browse', browse) # Callbacks are never cached
+    """
+    VERSION = 1 # Increase when the data of roputil.Node.to_dict() changes
+    DIRECTORY_ENV = 'OVFX_ROP_CACHE_DIR'
+    FRAGMENT_RE = re.compile(r'<([A-Za-z_]\w*)>|(?:bundle|frag)\(\s*[\'"]([A-Za-z_]\w*)[\'"]\s*\)')
+
+    __memory = {} # {key: definition data}, the definitions already read in this session
+
+    def __init__(self, script_path=None, location='scene', directory=None):
+        """
+        Args:
+            script_path (str)  : The configuration script, the calling script by default.
+            location (str)     : The hou.ovfx['loc'] context the fragments are read from.
+            directory (str)    : The cache folder, see OVFX_ROP_CACHE_DIR.
+        """
+        if script_path is None: # The script calling this constructor
+            script_path = sys._getframe(1).f_code.co_filename
+        self.__script_path = script_path
+        self.__directory = directory or os.environ.get(self.DIRECTORY_ENV) or os.path.join(os.path.expanduser('~'), '.cache', 'ovfx-houdini-rop')
+        self.__key = None
+        try:
+            with open(script_path, 'rb') as f:
+                source = f.read()
+        except (IOError, OSError): # Not a file, e.g. a script run from a string
+            return
+        fragments = sorted(set(a or b for a, b in self.FRAGMENT_RE.findall(source.decode('utf-8', 'replace'))))
+        context = hou.ovfx['loc'][location]
+        values = [(name, self.fragment_value(context, name)) for name in fragments]
+        self.__key = digest(self.VERSION, os.path.abspath(script_path), hashlib.md5(source).hexdigest(), context.valid(), values)
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} {} key={}>'.format(cl.__module__, cl.__name__, self.__script_path, self.__key)
+        return result
+
+    @staticmethod
+    def fragment_value(context, name):
+        """Return the value of a fragment of the context or None if it doesn't exist"""
+        try:
+            return context.bundle.frag(name).value()
+        except Exception: # Unknown fragment for this context
+            return None
+
+    def key(self):
+        return self.__key
+
+    def enabled(self):
+        return self.__key is not None
+
+    def path(self):
+        """Return the file of this context or None if the cache is disabled"""
+        if self.__key is None:
+            return None
+        return os.path.join(self.__directory, '{}.json'.format(self.__key))
+
+    def load(self):
+        """Return the cached roputil.Node of this context or None if there is none"""
+        if self.__key is None:
+            return None
+        data = PresetCache.__memory.get(self.__key)
+        if data is None:
+            try:
+                with open(self.path()) as f:
+                    data = json.load(f)
+            except (IOError, OSError, ValueError): # Not cached yet or unreadable
+                return None
+            PresetCache.__memory[self.__key] = data
+        try:
+            return Node.from_dict(data)
+        except (KeyError, TypeError, ValueError): # Written by an incompatible version
+            return None
+
+    def save(self, node):
+        """Write the definition of a roputil.Node for this context"""
+        if self.__key is None:
+            return
+        data = node.to_dict()
+        PresetCache.__memory[self.__key] = data
+        path = self.path()
+        temp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            if not os.path.isdir(self.__directory):
+                os.makedirs(self.__directory)
+            with open(temp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(temp_path, path) # Atomic so another session never reads a partial file
+        except (IOError, OSError): # The cache is only an optimization
+            pass
+
+
+class RopConfig(object):
+    """
+    Declarative configuration of Rop types read from a YAML or JSON file,
+    instead of a configuration script calling add_parm(), add_preset(),
+    add_menu() and add_button() for every type.
+
+    The file is compiled into a binary snapshot holding the roputil.Node
+    definitions of every context it was loaded in, translated. A scene open
+    or save then only checks the file modification time and reads one small
+    snapshot, nothing is parsed or translated again. The snapshot is kept in
+    the roputil.PresetCache folder, see OVFX_ROP_CACHE_DIR, and is compiled
+    again when the file changes.
+
+    File layout, the presets can have one value per context type:
+        contexts:              # The first context whose fragments all have a value is used
+          asset: [asset]
+          shot: []
+        rops:
+          geo:                 # Registered as hou.ovfx['rop']['Sop']['geo']
+            category: Sop
+            type: ovfx_geometry_cache
+            version: <ver>
+            parms:
+              sopoutput:
+                bound_menu: sopoutput_menu
+                presets:
+                  bgeo:
+                    asset: .../<asset>/<task>/geo/...bgeo.sc
+                    shot: .../<shot>/<task>/geo/...bgeo.sc
+              f:
+                bound_menu: f_menu
+                presets:
+                  scene: {value: [$FSTART, $FEND, 1], language: [Hscript, Hscript, null]}
+            menus:
+              sopoutput_menu: {adjacent_parm: sopoutput, position: join, values: sopoutput, callback: ...}
+            buttons:
+              browse: {label: Browse, adjacent_parm: refreshinfo, position: before, callback: ...}
+            callbacks:
+              browse: studio.rop.browse    # module.function, or add_callback() after loading
+    """
+    VERSION = 1 # Increase when the snapshot data changes
+    MAGIC = b'OVFXROP'
+    HEADER = struct.Struct('<HBB') # snapshot version, Python major and minor versions of the marshal data
+    MAX_CONTEXTS = 64
+    NODE_SETTINGS = ('version_padding', 'frame_padding', 'element_separator')
+    FRAGMENT_RE = re.compile(r'<([A-Za-z_]\w*)>')
+
+    __memory = {} # {snapshot path: snapshot data}, the snapshots already read in this session
+
+    def __init__(self, path, location='scene', directory=None):
+        """
+        Args:
+            path (str)         : The YAML or JSON configuration file.
+            location (str)     : The hou.ovfx['loc'] context the fragments are read from.
+            directory (str)    : The snapshot folder, see OVFX_ROP_CACHE_DIR.
+        """
+        self.__path = os.path.abspath(path)
+        self.__location = location
+        self.__directory = directory or os.environ.get(PresetCache.DIRECTORY_ENV) or os.path.join(os.path.expanduser('~'), '.cache', 'ovfx-houdini-rop')
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} {}>'.format(cl.__module__, cl.__name__, self.__path)
+        return result
+
+    def path(self):
+        return self.__path
+
+    def snapshot_path(self):
+        return os.path.join(self.__directory, '{}.ovfxrop'.format(digest(self.__path)))
+
+    def read_source(self):
+        """Return the description of the configuration file"""
+        with open(self.__path) as f:
+            if os.path.splitext(self.__path)[1].lower() == '.json':
+                return json.load(f)
+            if yaml is None:
+                raise ImportError('Reading {} requires the yaml module'.format(self.__path))
+            return yaml.safe_load(f)
+
+    @classmethod
+    def fragments(cls, description):
+        """Return the fragments the definitions depend on: the <fragment> tokens and the context fragments"""
+        names = set()
+        for fragments in (description.get('contexts') or {}).values():
+            names.update(fragments or [])
+        def collect(value):
+            if isinstance(value, str):
+                names.update(cls.FRAGMENT_RE.findall(value))
+            elif isinstance(value, dict):
+                for item in value.values():
+                    collect(item)
+            elif isinstance(value, (list, tuple)):
+                for item in value:
+                    collect(item)
+        collect(description.get('rops'))
+        return sorted(names)
+
+    def context(self):
+        return hou.ovfx['loc'][self.__location]
+
+    def context_key(self, fragments):
+        context = self.context()
+        return digest(context.valid(), [(name, PresetCache.fragment_value(context, name)) for name in fragments])
+
+    def context_type(self, description):
+        """Return the name of the first context type whose fragments all have a value, None without context types"""
+        context = self.context()
+        for name, fragments in (description.get('contexts') or {}).items():
+            if all(PresetCache.fragment_value(context, fragment) for fragment in fragments or []):
+                return name
+        return None
+
+    def compile(self, description):
+        """
+        Build the roputil.Node definitions of the current context.
+
+        Returns:
+            [{'name': str, 'node': roputil.Node.to_dict() data, 'callbacks': {parm name: 'module.function'}}]
+        """
+        context = self.context()
+        context_types = description.get('contexts') or {}
+        context_type = self.context_type(description)
+        translate = context.bundle.translate
+
+        def preset_value(entry):
+            """Return the (value, language) of the context type or None when the preset is not defined for it"""
+            if isinstance(entry, dict) and context_types and set(entry) & set(context_types):
+                if context_type not in entry:
+                    return None
+                entry = entry[context_type]
+            language = None
+            if isinstance(entry, dict):
+                entry, language = entry.get('value'), entry.get('language')
+            if isinstance(entry, list):
+                value = tuple(translate(item) if isinstance(item, str) else item for item in entry)
+            else:
+                value = translate(entry) if isinstance(entry, str) else entry
+            return value, tuple(language) if isinstance(language, list) else language
+
+        definitions = []
+        for name, rop in (description.get('rops') or {}).items():
+            settings = dict((key, rop[key]) for key in self.NODE_SETTINGS if key in rop)
+            version = rop.get('version', 1)
+            node = Node(rop['category'], rop['type'], version=translate(version) if isinstance(version, str) else version, **settings)
+            if context.valid(): # Nothing to set up outside of a valid context
+                for parm_name, parm_data in (rop.get('parms') or {}).items():
+                    parm_data = parm_data or {}
+                    bound_menu = parm_data.get('bound_menu')
+                    parm = node.add_parm(parm_name, bound_menu=tuple(bound_menu) if isinstance(bound_menu, list) else bound_menu)
+                    for key, entry in (parm_data.get('presets') or {}).items():
+                        preset = preset_value(entry)
+                        if preset is not None:
+                            parm.add_preset(key, preset[0], language=preset[1], is_template=parm_data.get('is_template', False))
+                for menu_name, menu_data in (rop.get('menus') or {}).items():
+                    values = menu_data.get('values', [])
+                    if isinstance(values, str): # The preset keys of a parm
+                        values = node.parm(values).unique_keys(0)
+                    node.add_menu(menu_name, menu_data.get('label', ''), menu_data['adjacent_parm'], position=menu_data.get('position', 'join'),
+                                  callback=menu_data.get('callback'), values=values)
+                for button_name, button_data in (rop.get('buttons') or {}).items():
+                    node.add_button(button_name, button_data.get('label', ''), button_data['adjacent_parm'], position=button_data.get('position', 'before'),
+                                    callback=button_data.get('callback'))
+            definitions.append({'name': name, 'node': node.to_dict(), 'callbacks': dict(rop.get('callbacks') or {})})
+        return definitions
+
+    @staticmethod
+    def resolve_callback(reference):
+        """Return the function of a 'module.function' reference"""
+        module_name, _, function_name = reference.rpartition('.')
+        return getattr(importlib.import_module(module_name), function_name)
+
+    def __read_snapshot(self):
+        path = self.snapshot_path()
+        data = RopConfig.__memory.get(path)
+        if data is not None:
+            return data
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+        except (IOError, OSError): # Not compiled yet
+            return None
+        start = len(self.MAGIC) + self.HEADER.size
+        if not content.startswith(self.MAGIC) or self.HEADER.unpack_from(content, len(self.MAGIC)) != (self.VERSION,) + sys.version_info[:2]:
+            return None # Written by another version
+        try:
+            data = marshal.loads(content[start:])
+        except (EOFError, ValueError, TypeError): # Truncated
+            return None
+        RopConfig.__memory[path] = data
+        return data
+
+    def __write_snapshot(self, data):
+        path = self.snapshot_path()
+        RopConfig.__memory[path] = data
+        temp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            if not os.path.isdir(self.__directory):
+                os.makedirs(self.__directory)
+            with open(temp_path, 'wb') as f:
+                f.write(self.MAGIC + self.HEADER.pack(self.VERSION, *sys.version_info[:2]) + marshal.dumps(data))
+            os.replace(temp_path, path) # Atomic so another session never reads a partial file
+        except (IOError, OSError): # The snapshot is only an optimization
+            pass
+
+    @profiled('RopConfig.load')
+    def load(self):
+        """
+        Return the roputil.Node of every Rop type of the file for the current
+        context, from the snapshot when the file didn't change.
+
+        Returns:
+            OrderedDict {name: roputil.Node}
+        """
+        stat = os.stat(self.__path)
+        source = [stat.st_mtime_ns, stat.st_size]
+        description = None
+        data = self.__read_snapshot()
+        if data is None or data.get('source') != source: # New or modified file
+            description = self.read_source()
+            data = {'source': source, 'fragments': self.fragments(description), 'contexts': {}}
+        key = self.context_key(data['fragments'])
+        definitions = data['contexts'].get(key)
+        if definitions is None: # New context
+            if description is None:
+                description = self.read_source()
+            definitions = self.compile(description)
+            contexts = dict(data['contexts']) if len(data['contexts']) < self.MAX_CONTEXTS else {}
+            contexts[key] = definitions
+            data = dict(data, contexts=contexts)
+            self.__write_snapshot(data)
+
+        result = collections.OrderedDict()
+        for definition in definitions:
+            node = Node.from_dict(definition['node'])
+            for parm_name, reference in definition['callbacks'].items():
+                node.add_callback(parm_name, self.resolve_callback(reference))
+            result[definition['name']] = node
+        return result
+
+    def register(self):
+        """
+        Load the Rop types and register them in roputil.types, which also sets
+        hou.ovfx['rop'][category][name].
+
+        Returns:
+            OrderedDict {name: roputil.Node}
+        """
+        definitions = self.load()
+        for name, definition in definitions.items():
+            types.register(definition, name)
+        return definitions
+
+
+if __name__ == '__main__':
+    # Run from hython by roputil.ParallelRender. Go through the imported module
+    # so the HDA callbacks share the same roputil objects.
+    import roputil
+    sys.exit(roputil.main())
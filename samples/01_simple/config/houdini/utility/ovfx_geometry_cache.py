@@ -1,14 +1,13 @@
 import hou
 import roputil
 
-# Initialize the roputil.Node and place it into the right dictionary based on the
-# Houdini node category names. For example a sop node will go in hou.ovfx['rop']['Sop']
+# Initialize the roputil.Node and register it. It is also placed into the right dictionary
+# based on the Houdini node category names. For example a sop node will go in hou.ovfx['rop']['Sop']
 # and an output Rop will go in hou.ovfx['rop']['Driver']
-if 'Sop' not in hou.ovfx['rop'].keys():
-    hou.ovfx['rop']['Sop'] = {} # Create the node category if it doesn't already exist
-geo = hou.ovfx['rop']['Sop']['geo'] = roputil.Node(node_category='Sop',
-                                        node_type='ovfx_geometry_cache',
-                                        version=hou.ovfx['loc']['scene'].bundle('ver').value())
+geo = roputil.Node(node_category='Sop',
+                   node_type='ovfx_geometry_cache',
+                   version=hou.ovfx['loc']['scene'].bundle('ver').value())
+roputil.types.register(geo, 'geo') # Also sets hou.ovfx['rop']['Sop']['geo']
 
 if hou.ovfx['loc']['scene'].valid():
     sopoutput = geo.add_parm('sopoutput')
@@ -17,4 +16,5 @@ if hou.ovfx['loc']['scene'].valid():
     else: ################# SHOT ###################
         sopoutput.add_preset(None, hou.ovfx['loc']['scene'].bundle.translate('$OVFX_PACKAGE_ROOT/open-vfx-houdini-rop/samples/projects/<proj>/<epis>/<seq>/<shot>/<task>/houdini/cache/geo/<task>_<scene_desc>_`chs("elem")``chs("tname")``chs("wedge")`/v`chs("wver")`/<proj>_<epis>_<seq>_<shot>_<task>_<scene_desc>_`chs("elem")``chs("tname")``chs("wedge")`_v`chs("wver")``chs("wframe")`.bgeo.sc'))
 
-geo.initialize_nodes()
+# Set up the nodes of every registered type in a single pass
+roputil.types.schedule_initialize()
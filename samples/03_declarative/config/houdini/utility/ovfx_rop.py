@@ -0,0 +1,24 @@
+import hou
+import os
+import roputil
+
+def browse(node):
+    """Open the folder of the read path"""
+    if node.parm('cachemode') and node.parm('cachemode').eval() == 2: # Proxy geometry
+        path = node.parm('prxrpath').eval()
+    else: # Standard geometry
+        path = node.parm('rpath').eval()
+    seq = roputil.scanner.snapshot(path)
+    if os.path.isdir(seq.directory()):
+        os.system('thunar {}'.format(seq.directory()))
+
+# Every Rop type is described in rop.yaml. The file is compiled once per
+# context into a snapshot so a scene open or save only reads one small file.
+config = roputil.RopConfig(os.path.join(os.environ['OVFX_CONFIG_DIR'], 'houdini', 'rop.yaml'))
+rops = config.register() # Also sets hou.ovfx['rop']['Sop']['geo']
+
+# Callbacks are functions of this script, they can also be referenced in rop.yaml as module.function
+rops['geo'].add_callback('browse', browse)
+
+# Set up the nodes of every registered type in a single pass
+roputil.types.schedule_initialize()